@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.api.fleet_store import ReloadingCSV
+
+
+@dataclass(frozen=True)
+class _CatalogSnapshot:
+    records: List[Dict[str, Any]]
+    farm: np.ndarray
+    ts_min: np.ndarray
+    ts_max: np.ndarray
+    by_file: Dict[str, int]
+    by_asset: Dict[Tuple[str, str], List[int]]
+    farms: List[Dict[str, Any]]
+
+
+def _farm_summary(farm_id: str, s: pd.DataFrame) -> Dict[str, Any]:
+    # empty datasets have no rate and no timestamps: leave them out rather than emit NaN/"NaT"
+    rated = s[s["abnormal_rate"].notna() & (s["n_rows"] > 0)]
+    ts_min, ts_max = s["ts_min"].min(), s["ts_max"].max()
+    return {
+        "farm_id": farm_id,
+        "n_assets": int(s["asset_id"].nunique()),
+        "n_datasets": int(len(s)),
+        "n_rows": int(s["n_rows"].sum()),
+        "ts_min": str(ts_min) if pd.notna(ts_min) else None,
+        "ts_max": str(ts_max) if pd.notna(ts_max) else None,
+        "abnormal_rate": float(np.average(rated["abnormal_rate"], weights=rated["n_rows"])) if len(rated) else None,
+    }
+
+
+class AssetIndex(ReloadingCSV):
+    """
+    dataset_catalog.csv as an in-memory asset registry:
+    - parquet_file -> dataset record and (farm_id, asset_id) -> that asset's datasets (O(1))
+    - per-farm summaries
+    - ts_min/ts_max coverage, so windows outside a dataset can be rejected without opening Parquet
+    An asset can have several datasets (files); they are kept newest (by ts_max) first.
+    """
+
+    def _build(self, df: pd.DataFrame) -> _CatalogSnapshot:
+        df = df.copy()
+        df["asset_id"] = df["asset_id"].astype(str)
+        df["dataset_id"] = df["dataset_id"].astype(str)
+        df["ts_min"] = pd.to_datetime(df["ts_min"], errors="coerce")
+        df["ts_max"] = pd.to_datetime(df["ts_max"], errors="coerce")
+        df = df.sort_values(["farm_id", "asset_id", "ts_max"], ascending=[True, True, False], kind="stable")
+        df = df.reset_index(drop=True)
+
+        out = df.astype(object).where(df.notna(), None)
+        for c in ("ts_min", "ts_max"):
+            out[c] = [str(t) if t is not None else None for t in out[c]]
+        records = out.to_dict("records")
+
+        by_asset: Dict[Tuple[str, str], List[int]] = {}
+        for i, r in enumerate(records):
+            by_asset.setdefault((r["farm_id"], r["asset_id"]), []).append(i)
+
+        farms = [_farm_summary(farm_id, s) for farm_id, s in df.groupby("farm_id")]
+        return _CatalogSnapshot(
+            records=records,
+            farm=df["farm_id"].to_numpy(dtype=object),
+            ts_min=df["ts_min"].to_numpy(dtype="datetime64[ns]"),
+            ts_max=df["ts_max"].to_numpy(dtype="datetime64[ns]"),
+            by_file={r["parquet_file"]: i for i, r in enumerate(records)},
+            by_asset=by_asset,
+            farms=farms,
+        )
+
+    def lookup_file(self, parquet_file: str) -> Optional[Dict[str, Any]]:
+        snap = self._snapshot()
+        if snap is None:
+            return None
+        i = snap.by_file.get(parquet_file)
+        return snap.records[i] if i is not None else None
+
+    def lookup(self, farm_id: str, asset_id: Any) -> List[Dict[str, Any]]:
+        """All datasets of an asset, newest first."""
+        snap = self._snapshot()
+        if snap is None:
+            return []
+        return [snap.records[i] for i in snap.by_asset.get((farm_id, str(asset_id)), [])]
+
+    def resolve(
+        self,
+        farm_id: str,
+        asset_id: Any,
+        t_start: Optional[pd.Timestamp] = None,
+        t_end: Optional[pd.Timestamp] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The asset's newest dataset whose coverage overlaps [t_start, t_end] (either bound may be
+        None), i.e. the same rule check_coverage applies to an explicit parquet_file.
+        """
+        snap = self._snapshot()
+        if snap is None:
+            return None
+        idx = snap.by_asset.get((farm_id, str(asset_id)), [])
+        lo = pd.Timestamp(t_start).to_datetime64() if t_start is not None else None
+        hi = pd.Timestamp(t_end).to_datetime64() if t_end is not None else None
+        for i in idx:
+            if (lo is None or snap.ts_max[i] >= lo) and (hi is None or snap.ts_min[i] <= hi):
+                return snap.records[i]
+        return None
+
+    def coverage(self, parquet_file: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """(ts_min, ts_max) of a dataset, or None if it isn't catalogued."""
+        snap = self._snapshot()
+        if snap is None:
+            return None
+        i = snap.by_file.get(parquet_file)
+        if i is None:
+            return None
+        return pd.Timestamp(snap.ts_min[i]), pd.Timestamp(snap.ts_max[i])
+
+    def farms(self) -> List[Dict[str, Any]]:
+        snap = self._snapshot()
+        if snap is None:
+            raise FileNotFoundError(self.path)
+        return list(snap.farms)
+
+    def assets(
+        self,
+        farms: Optional[List[str]] = None,
+        t_start: Optional[pd.Timestamp] = None,
+        t_end: Optional[pd.Timestamp] = None,
+        offset: int = 0,
+        limit: int = 1000,
+    ) -> Dict[str, Any]:
+        """Datasets by farm, optionally only those whose coverage overlaps [t_start, t_end]."""
+        snap = self._snapshot()
+        if snap is None:
+            raise FileNotFoundError(self.path)
+
+        mask = np.ones(len(snap.records), dtype=bool)
+        if farms:
+            mask &= np.isin(snap.farm, farms)
+        if t_start is not None:
+            mask &= snap.ts_max >= pd.Timestamp(t_start).to_datetime64()
+        if t_end is not None:
+            mask &= snap.ts_min <= pd.Timestamp(t_end).to_datetime64()
+        pos = np.flatnonzero(mask)
+
+        return {
+            "total": int(len(pos)),
+            "offset": offset,
+            "limit": limit,
+            "rows": [snap.records[i] for i in pos[offset: offset + limit]],
+        }
@@ -0,0 +1,81 @@
+from typing import List
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick n_out row indices that preserve the visual shape of y(x).
+    First and last points are always kept. x must be sorted ascending.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if np.isnan(y).any():
+        # gaps would turn every triangle area in their bucket into NaN; pick around them at the mean
+        y = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+
+    # n_out - 2 buckets between the fixed endpoints
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # average of the next bucket (or the last point) is the third triangle vertex
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Keep the min and max of each bucket (n_out // 2 buckets), so spikes are never dropped.
+    """
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    keep = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi <= lo:
+            continue
+        b = y[lo:hi]
+        keep.append(lo + int(np.nanargmin(b)) if not np.isnan(b).all() else lo)
+        keep.append(lo + int(np.nanargmax(b)) if not np.isnan(b).all() else hi - 1)
+    return np.unique(np.asarray(keep, dtype=np.int64))
+
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, n_out: int, method: str = "lttb") -> np.ndarray:
+    if method == "lttb":
+        return lttb_indices(x, y, n_out)
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Unknown downsampling method: {method}")
+
+
+def downsample_columns(x: np.ndarray, ys: List[np.ndarray], n_out: int, method: str = "lttb") -> np.ndarray:
+    """
+    Rows to keep for several columns sharing one x axis: each column picks its own indices from an
+    equal share of n_out (at least 3), and the union is returned, so a spike in any column survives.
+    """
+    n = len(x)
+    if n_out >= n or not ys:
+        return np.arange(n)
+    per_column = max(n_out // len(ys), 3)
+    return np.unique(np.concatenate([downsample_indices(x, y, per_column, method) for y in ys]))
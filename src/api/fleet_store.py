@@ -0,0 +1,238 @@
+import threading
+import warnings
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+RISK_BUCKETS = [("High", 80.0), ("Medium", 50.0), ("Low", -np.inf)]
+
+
+def risk_bucket(r: float) -> str:
+    for name, lo in RISK_BUCKETS:
+        if r >= lo:
+            return name
+    return "Low"
+
+
+class ReloadingCSV(ABC):
+    """
+    A CSV held in memory and rebuilt only when the file's mtime/size changes.
+    Subclasses build an immutable snapshot of their indexes in _build(); a reload swaps a single
+    reference, so readers take _snapshot() once per call and never see half-old, half-new state.
+    Each read costs one stat().
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._state: Optional[Tuple[Tuple[int, int], Any]] = None   # (file signature, snapshot)
+        self.n_reloads = 0
+        self.n_reads = 0
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _snapshot(self) -> Any:
+        """The current snapshot (rebuilt first if the file changed), or None if the file is missing."""
+        self.n_reads += 1
+        sig = self._signature()
+        if sig is None:
+            return None
+        state = self._state
+        if state is None or state[0] != sig:
+            with self._lock:
+                state = self._state
+                if state is None or state[0] != sig:
+                    state = (sig, self._build(pd.read_csv(self.path)))
+                    self._state = state
+                    self.n_reloads += 1
+        return state[1]
+
+    @abstractmethod
+    def _build(self, df: pd.DataFrame) -> Any:
+        """Index a freshly read CSV into a snapshot object that is never mutated afterwards."""
+
+
+@dataclass(frozen=True)
+class _FleetSnapshot:
+    df: pd.DataFrame
+    records: List[Dict[str, Any]]
+    risk: np.ndarray
+    farm: np.ndarray
+    by_file: Dict[str, Dict[str, Any]]
+    farms: List[str]
+
+
+class FleetStore(ReloadingCSV):
+    """
+    fleet_risk.csv as an indexed in-memory table:
+    - parquet_file -> row dict (O(1)); an asset can have several datasets, resolve those via AssetIndex
+    - rows sorted by risk_score so risk-range filters are a binary search (O(log n))
+    """
+
+    def _build(self, df: pd.DataFrame) -> _FleetSnapshot:
+        df = df.copy()
+        df["asset_id"] = df["asset_id"].astype(str)
+        df["risk_bucket"] = df["risk_score"].apply(risk_bucket)
+        df = df.sort_values("risk_score", kind="stable").reset_index(drop=True)
+
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        return _FleetSnapshot(
+            df=df,
+            records=records,
+            risk=df["risk_score"].to_numpy(dtype=np.float64),
+            farm=df["farm_id"].to_numpy(dtype=object),
+            by_file={r["parquet_file"]: r for r in records},
+            farms=sorted(df["farm_id"].dropna().unique().tolist()),
+        )
+
+    def lookup_file(self, parquet_file: str) -> Optional[Dict[str, Any]]:
+        snap = self._snapshot()
+        return snap.by_file.get(parquet_file) if snap else None
+
+    def farms(self) -> List[str]:
+        snap = self._snapshot()
+        return list(snap.farms) if snap else []
+
+    def query(
+        self,
+        farms: Optional[List[str]] = None,
+        risk_min: float = 0.0,
+        risk_max: float = 100.0,
+        sort_by: str = "risk_score",
+        ascending: bool = False,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        snap = self._snapshot()
+        if snap is None:
+            raise FileNotFoundError(self.path)
+        if sort_by not in snap.df.columns:
+            raise KeyError(sort_by)
+
+        lo = int(np.searchsorted(snap.risk, risk_min, side="left"))
+        hi = int(np.searchsorted(snap.risk, risk_max, side="right"))
+        pos = np.arange(lo, hi)
+        if farms:
+            pos = pos[np.isin(snap.farm[lo:hi], farms)]
+
+        if sort_by == "risk_score":
+            order = pos if ascending else pos[::-1]
+        else:
+            keys = snap.df[sort_by].to_numpy()[pos]
+            idx = pd.Series(keys).sort_values(ascending=ascending, kind="stable", na_position="last").index
+            order = pos[idx.to_numpy()]
+
+        risk = snap.risk[pos]
+        risk = risk[~np.isnan(risk)]   # an unscored row must not turn the summary into NaN (not JSON)
+        finite = snap.risk[~np.isnan(snap.risk)]
+        buckets = {name: 0 for name, _ in RISK_BUCKETS}
+        for name, n in zip(*np.unique(snap.df["risk_bucket"].to_numpy()[pos], return_counts=True)):
+            buckets[name] = int(n)
+
+        page = order[offset: offset + limit]
+        return {
+            "total": int(len(pos)),
+            "offset": offset,
+            "limit": limit,
+            "farms": list(snap.farms),
+            "risk_range": [float(finite.min()), float(finite.max())] if len(finite) else [0.0, 0.0],
+            "summary": {
+                "mean_risk": float(risk.mean()) if len(risk) else None,
+                "max_risk": float(risk.max()) if len(risk) else None,
+            },
+            "bucket_counts": buckets,
+            "rows": [snap.records[i] for i in page],
+        }
+
+
+@dataclass(frozen=True)
+class _HistorySnapshot:
+    ids: List[Dict[str, Any]]
+    farm: np.ndarray
+    days: List[str]
+    risk: np.ndarray
+    farms: List[str]
+
+
+class RiskHistoryStore(ReloadingCSV):
+    """
+    fleet_risk_history.csv (asset × day matrix from src.scoring.replay) held as a float matrix,
+    so heatmap requests are a column slice and a sort, never a model call.
+    """
+
+    ID_COLS = ["farm_id", "parquet_file", "asset_id"]
+    SORT_KEYS = ("latest", "peak", "mean")
+
+    def _build(self, df: pd.DataFrame) -> _HistorySnapshot:
+        df = df.copy()
+        df["asset_id"] = df["asset_id"].astype(str)
+        days = [c for c in df.columns if c not in self.ID_COLS]
+        return _HistorySnapshot(
+            ids=df[self.ID_COLS].to_dict("records"),
+            farm=df["farm_id"].to_numpy(dtype=object),
+            days=days,
+            risk=df[days].to_numpy(dtype=np.float64),
+            farms=sorted(df["farm_id"].dropna().unique().tolist()),
+        )
+
+    def query(
+        self,
+        farms: Optional[List[str]] = None,
+        days: Optional[int] = None,
+        sort_by: str = "latest",
+        limit: int = 200,
+    ) -> Dict[str, Any]:
+        snap = self._snapshot()
+        if snap is None:
+            raise FileNotFoundError(self.path)
+        if sort_by not in self.SORT_KEYS:
+            raise KeyError(sort_by)
+
+        cols = slice(-days, None) if days else slice(None)
+        pos = np.arange(len(snap.ids))
+        if farms:
+            pos = pos[np.isin(snap.farm, farms)]
+        risk = snap.risk[pos, cols]
+
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)   # all-NaN rows
+            if sort_by == "latest":
+                has = ~np.isnan(risk)
+                last = risk.shape[1] - 1 - np.argmax(has[:, ::-1], axis=1)
+                key = np.where(has.any(axis=1), risk[np.arange(len(risk)), last], np.nan)
+            elif sort_by == "peak":
+                key = np.nanmax(risk, axis=1)
+            else:
+                key = np.nanmean(risk, axis=1)
+            # per-day fleet aggregates over every matching asset, not just the returned page
+            n_assets = (~np.isnan(risk)).sum(axis=0)
+            mean_risk = np.nanmean(risk, axis=0)
+            n_high = (risk >= RISK_BUCKETS[0][1]).sum(axis=0)
+        order = np.argsort(np.nan_to_num(-key, nan=np.inf), kind="stable")[:limit]
+
+        page = risk[order]
+        return {
+            "total": int(len(pos)),
+            "farms": list(snap.farms),
+            "days": snap.days[cols],
+            "sort_by": sort_by,
+            "assets": [snap.ids[i] for i in pos[order]],
+            "risk": np.where(np.isnan(page), None, page).tolist(),
+            "trend": {
+                "mean_risk": np.where(np.isnan(mean_risk), None, mean_risk).tolist(),
+                "n_high": n_high.tolist(),
+                "n_assets": n_assets.tolist(),
+            },
+        }
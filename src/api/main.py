@@ -1,156 +1,148 @@
 import json
-from pathlib import Path
+import threading
+import time
+from contextlib import asynccontextmanager
 from typing import Optional, List, Dict, Any
 
-import numpy as np
-import pandas as pd
-import joblib
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from functools import lru_cache
-
-PARQUET_DIR = Path("data/processed/scada_parquet")
-RISK_CSV = Path("data/processed/fleet_risk.csv")
-THR_PATH = Path("models/baseline/thresholds.json")
-MODEL_DIR = Path("models/baseline")
-
-app = FastAPI(title="Wind Fleet Health API", version="0.1.0")
-
-class ScoreRequest(BaseModel):
-    farm_id: str
-    parquet_file: Optional[str] = None   # preferred
-    asset_id: Optional[str] = None       # fallback
-    lookback_hours: int = 24
-
-def align_features(df: pd.DataFrame, feats: List[str]) -> pd.DataFrame:
-    for c in feats:
-        if c not in df.columns:
-            df[c] = 0.0
-    return df[feats]
-
-def compute_risk(scores: np.ndarray, threshold: float) -> Dict[str, float]:
-    alerts = (scores >= threshold).astype(int)
-    alert_rate = float(alerts.mean()) if len(alerts) else 0.0
-    max_score = float(scores.max()) if len(scores) else 0.0
-    risk = 100 * (0.7 * alert_rate + 0.3 * (max_score / (threshold + 1e-6)))
-    return {
-        "risk_score": float(np.clip(risk, 0, 100)),
-        "alert_rate": alert_rate,
-        "max_anomaly_score": max_score,
-    }
-
-def top_contributors(df_recent: pd.DataFrame, feats: List[str], tmax: pd.Timestamp) -> List[Dict[str, Any]]:
-    # baseline = earlier period (or first 30%) for simple explainability
-    baseline = df_recent.iloc[: max(200, int(0.3 * len(df_recent)))].copy()
-    recent_24h = df_recent[df_recent["timestamp"] >= (tmax - pd.Timedelta(hours=24))].copy()
-    if len(recent_24h) < 50:
-        recent_24h = df_recent.tail(200).copy()
-
-    base_mean = baseline[feats].mean(numeric_only=True)
-    base_std = baseline[feats].std(numeric_only=True).replace(0, np.nan)
-    rec_mean = recent_24h[feats].mean(numeric_only=True)
-
-    z_shift = ((rec_mean - base_mean).abs() / base_std).replace([np.inf, -np.inf], np.nan).dropna()
-    top = z_shift.sort_values(ascending=False).head(10)
-
-    out = []
-    for f in top.index:
-        out.append({
-            "feature": f,
-            "z_shift": float(top.loc[f]),
-            "recent_mean": float(rec_mean.loc[f]),
-            "baseline_mean": float(base_mean.loc[f]),
-        })
-    return out
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from src.api.schemas import ScoreRequest, TimeseriesRequest
+from src.config import settings
+from src.monitoring.telemetry import REGISTRY, Profile
+
+# Only FastAPI/pydantic load at import time. pandas/NumPy/pyarrow/joblib live in src.api.service,
+# imported on first use (or by the background warm-up), and sklearn only comes in when a model is unpickled.
+
+_readiness: Dict[str, Any] = {"status": "starting", "started_at": time.time()}
+
+
+def _service():
+    from src.api import service
+    return service
+
+
+def _warm_up():
+    t0 = time.perf_counter()
+    try:
+        result = _service().warm_up()
+    except Exception as e:
+        _readiness.update(status="error", detail=str(e))
+        return
+    # a farm whose model failed to load would 500 on every request: stay out of rotation
+    status = "degraded" if result.get("errors") else "ready"
+    _readiness.update(status=status, warmup_s=time.perf_counter() - t0, **result)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.warmup:
+        threading.Thread(target=_warm_up, name="wfh-warmup", daemon=True).start()
+    else:
+        _readiness["status"] = "ready"   # lazy: first request pays the import/model-load cost
+    yield
+
+
+app = FastAPI(title="Wind Fleet Health API", version="0.1.0", lifespan=lifespan)
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REGISTRY.observe(
+        "http_request_seconds",
+        time.perf_counter() - t0,
+        path=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
-@lru_cache(maxsize=16)
-def load_model(farm_id: str):
-    pack = joblib.load(MODEL_DIR / f"isoforest_{farm_id}.joblib")
-    model = pack["model"]
-    feats = list(pack["features"])
-    n_expected = int(getattr(model, "n_features_in_", len(feats)))
-    feats = feats[:n_expected]
-    return model, feats
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once heavy imports and models are warm, 503 before, if warm-up failed or if any farm's model failed to load ("degraded")."""
+    return JSONResponse(_readiness, status_code=200 if _readiness["status"] == "ready" else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition: stage/request latency histograms, rows scored, cache and model-load counters."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/farms")
+def farms():
+    """Per-farm summaries from the dataset catalog: assets, datasets, rows, time coverage, abnormal rate."""
+    return _service().farms()
+
+@app.get("/assets")
+def assets(
+    farm: Optional[List[str]] = Query(None),
+    t_start: Optional[str] = None,
+    t_end: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+):
+    """Catalogued datasets per asset, optionally only those with data overlapping [t_start, t_end]."""
+    return _service().assets(farm, t_start, t_end, offset, limit)
+
+@app.get("/assets/{farm_id}/{asset_id}")
+def asset(farm_id: str, asset_id: str):
+    """One asset: its datasets (newest first) with coverage, plus its current fleet_risk row if any."""
+    return _service().asset(farm_id, asset_id)
+
+@app.get("/fleet")
+def fleet(
+    farm: Optional[List[str]] = Query(None),
+    risk_min: float = 0.0,
+    risk_max: float = 100.0,
+    sort_by: str = "risk_score",
+    order: str = "desc",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=5000),
+):
+    """
+    Filtered, sorted, paginated fleet ranking served from memory, plus risk bucket counts
+    for the filtered set.
+    """
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Unknown order {order}")
+    return _service().fleet(farm, risk_min, risk_max, sort_by, order, offset, limit)
+
+@app.get("/fleet/history")
+def fleet_history(
+    farm: Optional[List[str]] = Query(None),
+    days: Optional[int] = Query(None, ge=1),
+    sort_by: str = "latest",
+    limit: int = Query(200, ge=1, le=5000),
+):
+    """
+    Asset × day risk matrix from the historical replay (last `days` days), rows sorted by
+    latest, peak or mean risk. Served from memory; no model calls.
+    """
+    return _service().fleet_history(farm, days, sort_by, limit)
 
 @app.post("/score")
 def score(req: ScoreRequest):
-    if not THR_PATH.exists():
-        raise HTTPException(status_code=500, detail="Missing thresholds.json. Run thresholding step.")
-
-    thr = json.loads(THR_PATH.read_text())
-
-    if req.farm_id not in thr:
-        raise HTTPException(status_code=400, detail=f"Unknown farm_id {req.farm_id}")
-
-    model_pack = joblib.load(MODEL_DIR / f"isoforest_{req.farm_id}.joblib")
-    model = model_pack["model"]
-    feats = list(model_pack["features"])
-
-    n_expected = int(getattr(model, "n_features_in_", len(feats)))
-    if len(feats) != n_expected:
-        feats = feats[:n_expected]
-
-    threshold = float(thr[req.farm_id]["threshold"])
-
-    # resolve parquet file
-    parquet_file = req.parquet_file
-    if parquet_file is None:
-        if req.asset_id is None:
-            raise HTTPException(status_code=400, detail="Provide either parquet_file or asset_id")
-        if not RISK_CSV.exists():
-            raise HTTPException(status_code=500, detail="Missing fleet_risk.csv to map asset_id->parquet_file")
-        fleet = pd.read_csv(RISK_CSV)
-        match = fleet[(fleet["farm_id"] == req.farm_id) & (fleet["asset_id"].astype(str) == str(req.asset_id))].head(1)
-        if match.empty:
-            raise HTTPException(status_code=404, detail="asset_id not found in fleet_risk.csv for this farm")
-        parquet_file = match["parquet_file"].iloc[0]
-
-
-    path = PARQUET_DIR / parquet_file
-    if not path.exists():
-        raise HTTPException(status_code=404, detail=f"Parquet not found: {path}")
-
-    cols = list(set(feats + ["timestamp", "asset_id"]))
-    df = pd.read_parquet(path, columns=cols)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df = df.dropna(subset=["timestamp"]).sort_values("timestamp")
-    if df.empty:
-        raise HTTPException(status_code=500, detail="No timestamped rows in parquet.")
-
-    tmax = df["timestamp"].max()
-    tmin = tmax - pd.Timedelta(hours=req.lookback_hours)
-    recent = df[df["timestamp"] >= tmin].copy()
-    
-    if recent.empty:
-        raise HTTPException(status_code=400, detail="No rows in lookback window.")
-    MAX_POINTS = 50_000  # safe + fast
-    if len(recent) > MAX_POINTS:
-        recent = recent.sample(MAX_POINTS, random_state=42).sort_values("timestamp")
-    X = align_features(recent, feats).fillna(0.0).to_numpy(dtype=np.float32, copy=False)
-    scores = -model.score_samples(X)
-    metrics = compute_risk(scores, threshold)
-
-    # return a few alert timestamps (last 50)
-    recent["anomaly_score"] = scores
-    recent["alert"] = (recent["anomaly_score"] >= threshold).astype(int)
-    alert_times = recent[recent["alert"] == 1][["timestamp", "anomaly_score"]].tail(50)
-    
-
-    return {
-        "farm_id": req.farm_id,
-        "parquet_file": parquet_file,
-        "asset_id": str(recent["asset_id"].iloc[0]),
-        "t_end": str(tmax),
-        "lookback_hours": req.lookback_hours,
-        "threshold": threshold,
-        **metrics,
-        "alerts_tail": [
-            {"timestamp": str(r["timestamp"]), "anomaly_score": float(r["anomaly_score"])}
-            for _, r in alert_times.iterrows()
-        ],
-        "top_contributors": top_contributors(recent, feats, tmax),
-    }
+    with Profile(req.profile) as prof:
+        out = _service().score(req)
+    if req.profile:
+        out["profile"] = prof.report()
+    return out
 
+@app.post("/timeseries")
+def timeseries(req: TimeseriesRequest):
+    """
+    Anomaly score + selected sensors over a time range, downsampled server-side to max_points
+    so the drilldown can chart months of history without shipping every raw row.
+    """
+    with Profile(req.profile) as prof:
+        out = _service().timeseries(req)
+    if req.profile:
+        if isinstance(out, Response):
+            out.headers["X-WFH-Profile"] = json.dumps(prof.report())
+        else:
+            out["profile"] = prof.report()
+    return out
@@ -0,0 +1,27 @@
+from typing import Optional, List
+
+from pydantic import BaseModel, Field
+
+
+class ScoreRequest(BaseModel):
+    farm_id: str
+    parquet_file: Optional[str] = None   # preferred
+    asset_id: Optional[str] = None       # fallback
+    t_end: Optional[str] = None          # default: last timestamp in the file
+    lookback_hours: int = 24
+    exact: bool = False                  # score every row in fixed-size chunks instead of sampling
+    profile: bool = False                # include a per-stage timing breakdown in the response
+
+
+class TimeseriesRequest(BaseModel):
+    farm_id: str
+    parquet_file: Optional[str] = None
+    asset_id: Optional[str] = None
+    t_start: Optional[str] = None        # default: t_end - lookback_hours
+    t_end: Optional[str] = None          # default: last timestamp in the file
+    lookback_hours: int = 720
+    sensors: List[str] = []
+    max_points: int = Field(default=2000, ge=3, le=50_000)
+    method: str = "lttb"                 # "lttb" | "minmax"
+    format: str = "json"                 # "json" (columnar) | "arrow" (IPC stream)
+    profile: bool = False
@@ -0,0 +1,397 @@
+import json
+import time
+from functools import lru_cache
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import HTTPException, Response
+
+from src.api.asset_index import AssetIndex
+from src.api.downsample import downsample_columns
+from src.api.fleet_store import FleetStore, RiskHistoryStore
+from src.api.schemas import ScoreRequest, TimeseriesRequest
+from src.config import settings
+from src.monitoring.telemetry import REGISTRY, stage, inc, rows_scored
+from src.scoring.risk import feature_matrix, compute_risk, load_pack
+from src.scoring.streaming import plan_window, iter_scored_chunks, score_window_exact
+
+PARQUET_DIR = settings.parquet_dir
+RISK_CSV = settings.fleet_risk_csv
+CATALOG_CSV = settings.catalog_csv
+HISTORY_CSV = settings.fleet_history_csv
+THR_PATH = settings.thresholds_path
+MAX_POINTS = settings.max_sample_points  # sampled (non-exact) /score cap
+
+# fleet ranking kept in memory; reloaded when fleet_risk.csv changes on disk
+fleet_store = FleetStore(RISK_CSV)
+history_store = RiskHistoryStore(HISTORY_CSV)
+# asset/dataset registry (coverage, farm summaries); reloaded when dataset_catalog.csv changes
+asset_index = AssetIndex(CATALOG_CSV)
+
+def top_contributors(df_recent: pd.DataFrame, feats: List[str], tmax: pd.Timestamp) -> List[Dict[str, Any]]:
+    # baseline = earlier period (or first 30%) for simple explainability
+    baseline = df_recent.iloc[: max(200, int(0.3 * len(df_recent)))].copy()
+    recent_24h = df_recent[df_recent["timestamp"] >= (tmax - pd.Timedelta(hours=24))].copy()
+    if len(recent_24h) < 50:
+        recent_24h = df_recent.tail(200).copy()
+
+    base_mean = baseline[feats].mean(numeric_only=True)
+    base_std = baseline[feats].std(numeric_only=True).replace(0, np.nan)
+    rec_mean = recent_24h[feats].mean(numeric_only=True)
+
+    z_shift = ((rec_mean - base_mean).abs() / base_std).replace([np.inf, -np.inf], np.nan).dropna()
+    top = z_shift.sort_values(ascending=False).head(10)
+
+    out = []
+    for f in top.index:
+        out.append({
+            "feature": f,
+            "z_shift": float(top.loc[f]),
+            "recent_mean": float(rec_mean.loc[f]),
+            "baseline_mean": float(base_mean.loc[f]),
+        })
+    return out
+
+def parse_ts(value: Optional[str], name: str) -> Optional[pd.Timestamp]:
+    if value is None:
+        return None
+    try:
+        ts = pd.Timestamp(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value!r}")
+    # catalog and Parquet timestamps are naive UTC; compare like with like
+    return ts.tz_convert(None) if ts.tzinfo is not None else ts
+
+def resolve_parquet_file(
+    farm_id: str,
+    parquet_file: Optional[str],
+    asset_id: Optional[str],
+    t_start: Optional[pd.Timestamp] = None,
+    t_end: Optional[pd.Timestamp] = None,
+) -> str:
+    if parquet_file is None:
+        if asset_id is None:
+            raise HTTPException(status_code=400, detail="Provide either parquet_file or asset_id")
+        if not asset_index.exists():
+            raise HTTPException(status_code=500, detail="Missing dataset_catalog.csv. Run: python -m src.data.catalog")
+        match = asset_index.resolve(farm_id, asset_id, t_start, t_end)
+        if match is None:
+            if asset_index.lookup(farm_id, asset_id):
+                inc("coverage_rejections_total")
+                raise HTTPException(
+                    status_code=400, detail=f"No dataset of asset {asset_id} overlaps [{t_start}, {t_end}]",
+                )
+            raise HTTPException(status_code=404, detail="asset_id not found in dataset_catalog.csv for this farm")
+        parquet_file = match["parquet_file"]
+    else:
+        match = asset_index.lookup_file(parquet_file)
+        if match is not None and match["farm_id"] != farm_id:
+            raise HTTPException(status_code=400, detail=f"{parquet_file} belongs to {match['farm_id']}, not {farm_id}")
+
+    path = PARQUET_DIR / parquet_file
+    if not path.exists():
+        raise HTTPException(status_code=404, detail=f"Parquet not found: {path}")
+    return parquet_file
+
+def check_coverage(parquet_file: str, t_start: Optional[pd.Timestamp], t_end: Optional[pd.Timestamp]) -> None:
+    """Reject a window that can't overlap the dataset's catalogued [ts_min, ts_max], before reading Parquet."""
+    cov = asset_index.coverage(parquet_file)
+    if cov is None:
+        return
+    ts_min, ts_max = cov
+    if (t_end is not None and t_end < ts_min) or (t_start is not None and t_start > ts_max):
+        inc("coverage_rejections_total")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Window [{t_start}, {t_end}] is outside the data coverage [{ts_min}, {ts_max}] of {parquet_file}",
+        )
+
+@lru_cache(maxsize=16)
+def load_model(farm_id: str):
+    """load_pack, once per farm per process."""
+    return load_pack(farm_id)
+
+def _cache_stats():
+    info = load_model.cache_info()
+    return [
+        ("cache_hits_total", "counter", {"cache": "model"}, info.hits),
+        ("cache_hits_total", "counter", {"cache": "fleet_index"}, fleet_store.n_reads - fleet_store.n_reloads),
+        ("cache_hits_total", "counter", {"cache": "fleet_history"}, history_store.n_reads - history_store.n_reloads),
+        ("cache_hits_total", "counter", {"cache": "asset_index"}, asset_index.n_reads - asset_index.n_reloads),
+        ("cache_misses_total", "counter", {"cache": "model"}, info.misses),
+        ("cache_misses_total", "counter", {"cache": "fleet_index"}, fleet_store.n_reloads),
+        ("cache_misses_total", "counter", {"cache": "fleet_history"}, history_store.n_reloads),
+        ("cache_misses_total", "counter", {"cache": "asset_index"}, asset_index.n_reloads),
+    ]
+
+REGISTRY.register_collector(_cache_stats)
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Pay the first-request costs up front: unpickle every farm's model (this is what imports
+    sklearn) and build the fleet and asset indexes. Called from the API's background warm-up thread.
+    """
+    loaded, errors = [], {}
+    farms = list(json.loads(THR_PATH.read_text())) if THR_PATH.exists() else []
+    for farm_id in farms:
+        try:
+            load_model(farm_id)
+            loaded.append(farm_id)
+        except Exception as e:
+            errors[farm_id] = str(e)
+    fleet_store.farms()
+    if asset_index.exists():
+        asset_index.farms()
+    return {"models": loaded, "errors": errors}
+
+def fleet(
+    farms: Optional[List[str]],
+    risk_min: float,
+    risk_max: float,
+    sort_by: str,
+    order: str,
+    offset: int,
+    limit: int,
+) -> Dict[str, Any]:
+    try:
+        return fleet_store.query(
+            farms=farms,
+            risk_min=risk_min,
+            risk_max=risk_max,
+            sort_by=sort_by,
+            ascending=(order == "asc"),
+            offset=offset,
+            limit=limit,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Missing fleet_risk.csv. Run: python -m src.scoring.fleet_risk")
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort_by {sort_by}")
+
+def fleet_history(farms: Optional[List[str]], days: Optional[int], sort_by: str, limit: int) -> Dict[str, Any]:
+    try:
+        return history_store.query(farms=farms, days=days, sort_by=sort_by, limit=limit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Missing fleet_risk_history.csv. Run: python -m src.scoring.replay")
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort_by {sort_by}")
+
+def farms() -> Dict[str, Any]:
+    try:
+        return {"farms": asset_index.farms()}
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Missing dataset_catalog.csv. Run: python -m src.data.catalog")
+
+def assets(
+    farms: Optional[List[str]],
+    t_start: Optional[str],
+    t_end: Optional[str],
+    offset: int,
+    limit: int,
+) -> Dict[str, Any]:
+    try:
+        return asset_index.assets(
+            farms=farms,
+            t_start=parse_ts(t_start, "t_start"),
+            t_end=parse_ts(t_end, "t_end"),
+            offset=offset,
+            limit=limit,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail="Missing dataset_catalog.csv. Run: python -m src.data.catalog")
+
+def asset(farm_id: str, asset_id: str) -> Dict[str, Any]:
+    if not asset_index.exists():
+        raise HTTPException(status_code=500, detail="Missing dataset_catalog.csv. Run: python -m src.data.catalog")
+    datasets = asset_index.lookup(farm_id, asset_id)
+    if not datasets:
+        raise HTTPException(status_code=404, detail="asset_id not found in dataset_catalog.csv for this farm")
+    return {
+        "farm_id": farm_id,
+        "asset_id": str(asset_id),
+        "datasets": datasets,
+        "risk": fleet_store.lookup_file(datasets[0]["parquet_file"]),   # newest dataset
+    }
+
+def score(req: ScoreRequest) -> Dict[str, Any]:
+    if not THR_PATH.exists():
+        raise HTTPException(status_code=500, detail="Missing thresholds.json. Run thresholding step.")
+
+    thr = json.loads(THR_PATH.read_text())
+
+    if req.farm_id not in thr:
+        raise HTTPException(status_code=400, detail=f"Unknown farm_id {req.farm_id}")
+
+    t_end = parse_ts(req.t_end, "t_end")
+    t_start = t_end - pd.Timedelta(hours=req.lookback_hours) if t_end is not None else None
+    parquet_file = resolve_parquet_file(req.farm_id, req.parquet_file, req.asset_id, t_start, t_end)
+    if t_end is not None:
+        check_coverage(parquet_file, t_start, t_end)
+    path = PARQUET_DIR / parquet_file
+
+    model, feats = load_model(req.farm_id)
+    threshold = float(thr[req.farm_id]["threshold"])
+
+    if req.exact:
+        try:
+            result = score_window_exact(path, model, feats, threshold, req.lookback_hours, t_end=t_end)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "farm_id": req.farm_id,
+            "parquet_file": parquet_file,
+            "lookback_hours": req.lookback_hours,
+            "threshold": threshold,
+            "exact": True,
+            **result,
+        }
+
+    cols = list(set(feats + ["timestamp", "asset_id"]))
+    with stage("read_parquet"):
+        df = pd.read_parquet(path, columns=cols)
+    with stage("to_datetime"):
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        df = df.dropna(subset=["timestamp"]).sort_values("timestamp")
+    if df.empty:
+        raise HTTPException(status_code=500, detail="No timestamped rows in parquet.")
+
+    tmax = t_end if t_end is not None else df["timestamp"].max()
+    tmin = tmax - pd.Timedelta(hours=req.lookback_hours)
+    recent = df[(df["timestamp"] >= tmin) & (df["timestamp"] <= tmax)].copy()
+    
+    if recent.empty:
+        raise HTTPException(status_code=400, detail="No rows in lookback window.")
+    if len(recent) > MAX_POINTS:
+        recent = recent.sample(MAX_POINTS, random_state=42).sort_values("timestamp")
+    with stage("align_features"):
+        X = feature_matrix(recent, feats)
+    t0 = time.perf_counter()
+    with stage("score_samples"):
+        scores = -model.score_samples(X)
+    rows_scored(len(X), time.perf_counter() - t0, source="api")
+    risk, alert_rate, max_score = compute_risk(scores, threshold)
+
+    # return a few alert timestamps (last 50)
+    recent["anomaly_score"] = scores
+    recent["alert"] = (recent["anomaly_score"] >= threshold).astype(int)
+    alert_times = recent[recent["alert"] == 1][["timestamp", "anomaly_score"]].tail(50)
+    with stage("top_contributors"):
+        contributors = top_contributors(recent, feats, tmax)
+
+    return {
+        "farm_id": req.farm_id,
+        "parquet_file": parquet_file,
+        "asset_id": str(recent["asset_id"].iloc[0]),
+        "t_end": str(tmax),
+        "lookback_hours": req.lookback_hours,
+        "threshold": threshold,
+        "exact": False,
+        "risk_score": risk,
+        "alert_rate": alert_rate,
+        "max_anomaly_score": max_score,
+        "alerts_tail": [
+            {"timestamp": str(r["timestamp"]), "anomaly_score": float(r["anomaly_score"])}
+            for _, r in alert_times.iterrows()
+        ],
+        "top_contributors": contributors,
+    }
+
+def timeseries(req: TimeseriesRequest):
+    """Anomaly score + selected sensors over a range, streamed in chunks and downsampled to max_points."""
+    if req.method not in ("lttb", "minmax"):
+        raise HTTPException(status_code=400, detail=f"Unknown method {req.method}")
+    if req.format not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail=f"Unknown format {req.format}")
+    if not THR_PATH.exists():
+        raise HTTPException(status_code=500, detail="Missing thresholds.json. Run thresholding step.")
+
+    thr = json.loads(THR_PATH.read_text())
+    if req.farm_id not in thr:
+        raise HTTPException(status_code=400, detail=f"Unknown farm_id {req.farm_id}")
+    t_start, t_end = parse_ts(req.t_start, "t_start"), parse_ts(req.t_end, "t_end")
+    if t_start is None and t_end is not None:
+        t_start = t_end - pd.Timedelta(hours=req.lookback_hours)
+    parquet_file = resolve_parquet_file(req.farm_id, req.parquet_file, req.asset_id, t_start, t_end)
+    if t_start is not None or t_end is not None:
+        check_coverage(parquet_file, t_start, t_end)
+    path = PARQUET_DIR / parquet_file
+
+    threshold = float(thr[req.farm_id]["threshold"])
+    model, feats = load_model(req.farm_id)
+
+    schema = pq.read_schema(path)
+    missing = [c for c in req.sensors if c not in schema.names]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Unknown sensors: {missing}")
+    non_numeric = [
+        c for c in req.sensors
+        if not (pa.types.is_integer(schema.field(c).type) or pa.types.is_floating(schema.field(c).type))
+    ]
+    if non_numeric:
+        raise HTTPException(status_code=400, detail=f"Non-numeric sensors: {non_numeric}")
+
+    try:
+        plan = plan_window(
+            path,
+            lookback_hours=req.lookback_hours,
+            t_start=t_start,
+            t_end=t_end,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if plan.n == 0:
+        raise HTTPException(status_code=400, detail="No rows in requested range.")
+
+    # stream the range in chunks; only timestamps, scores and the requested sensors are kept
+    pos_parts, score_parts, sensor_parts = [], [], {c: [] for c in req.sensors}
+    for pos, df, scores in iter_scored_chunks(path, model, feats, plan, tuple(req.sensors)):
+        pos_parts.append(pos)
+        score_parts.append(scores)
+        for c in req.sensors:
+            sensor_parts[c].append(df[c].to_numpy(dtype=np.float32))
+
+    pos = np.concatenate(pos_parts)
+    order = np.argsort(plan.ts[pos], kind="stable")
+    ts_ms = plan.ts[pos][order].astype("datetime64[ms]").astype(np.int64)
+    scores = np.concatenate(score_parts)[order]
+    sensors = {c: np.concatenate(sensor_parts[c])[order] for c in req.sensors}
+    with stage("downsample"):
+        # every column picks its own points (score and each sensor), on the shared timestamp axis
+        keep = downsample_columns(ts_ms, [scores, *sensors.values()], req.max_points, req.method)
+
+    columns: Dict[str, Any] = {
+        "timestamp": ts_ms[keep],
+        "anomaly_score": scores[keep].astype(np.float32),
+    }
+    for c, values in sensors.items():
+        columns[c] = values[keep]
+
+    meta = {
+        "farm_id": req.farm_id,
+        "parquet_file": parquet_file,
+        "t_start": str(pd.Timestamp(ts_ms[0], unit="ms")),
+        "t_end": str(pd.Timestamp(ts_ms[-1], unit="ms")),
+        "threshold": threshold,
+        "method": req.method,
+        "n_points_raw": int(len(ts_ms)),
+        "n_points": int(len(keep)),
+    }
+
+    if req.format == "arrow":
+        table = pa.table(columns).replace_schema_metadata({k: str(v) for k, v in meta.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type="application/vnd.apache.arrow.stream")
+
+    # columnar JSON: timestamps as epoch milliseconds, NaN -> null
+    return {
+        **meta,
+        "columns": {
+            k: [None if isinstance(v, float) and np.isnan(v) else v for v in arr.tolist()]
+            for k, arr in columns.items()
+        },
+    }
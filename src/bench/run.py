@@ -0,0 +1,264 @@
+"""
+End-to-end benchmark on a synthetic fleet: times every pipeline stage and API latency percentiles,
+and saves the results as JSON so runs can be compared.
+
+    python -m src.bench.run --assets 5 --years 0.5 --features 80,250
+    python -m src.bench.run --baseline reports/benchmarks/bench_<previous>.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from src.bench.synthetic import generate, parse_features
+from src.config import settings
+from src.data import load, catalog, label, split
+from src.models import train_isoforest
+from src.scoring import fleet_risk, sharded, replay
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+OUT_DIR = settings.reports_dir / "benchmarks"
+THRESHOLD_QUANTILE = "0.99"   # from the training score quantiles stored in each pack
+
+
+@contextmanager
+def chdir(path: Path):
+    prev = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev)
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def percentiles(samples_s: List[float]) -> Dict[str, float]:
+    ms = np.asarray(samples_s) * 1000
+    return {
+        "n": int(len(ms)),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def write_thresholds() -> None:
+    """Stand-in for the thresholding step: per-farm threshold from the pack's training score quantile."""
+    import joblib
+
+    thr = {}
+    for p in sorted(settings.model_dir.glob("isoforest_*.joblib")):
+        farm = p.stem.replace("isoforest_", "", 1)
+        pack = joblib.load(p)
+        q = pack["train_stats"]["train_score_quantiles"][THRESHOLD_QUANTILE]
+        thr[farm] = {"threshold": q, "quantile": float(THRESHOLD_QUANTILE), "source": "bench"}
+    settings.thresholds_path.write_text(json.dumps(thr, indent=2))
+
+
+def build_scada_all() -> None:
+    files = sorted(settings.parquet_dir.glob("*.parquet"))
+    pd.concat([pd.read_parquet(p) for p in files], ignore_index=True).to_parquet(
+        settings.scada_all_path, index=False
+    )
+
+
+def run_stages(cpus: int, with_label: bool) -> Dict[str, Dict[str, Any]]:
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def stage(name: str, fn: Callable[[], Any]) -> None:
+        print(f"[bench] {name} ...", flush=True)
+        stages[name] = {"seconds": timed(fn)}
+        print(f"[bench] {name}: {stages[name]['seconds']:.2f}s", flush=True)
+
+    stage("load", load.main)
+    stage("catalog", catalog.main)
+    if with_label:
+        build_scada_all()
+        stage("label", label.main)
+    stage("split", split.main)
+    stage("train", lambda: train_isoforest.main(["--cpus", str(cpus)]))
+    write_thresholds()
+    stage("fleet_risk", fleet_risk.main)
+    stage("fleet_risk_sharded", lambda: sharded.main(["run", "--workers", str(cpus), "--unit-size", "4"]))
+    stage("replay", lambda: replay.main([]))
+
+    stages["catalog"]["rows"] = int(pd.read_csv(settings.catalog_csv)["n_rows"].sum())
+    stages["fleet_risk"]["assets"] = int(len(pd.read_csv(settings.fleet_risk_csv)))
+    return stages
+
+
+def run_api(n_requests: int) -> Dict[str, Dict[str, Any]]:
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError as e:  # TestClient needs httpx
+        print(f"[bench] skipping API latency: {e}")
+        return {}
+
+    from src.api.main import app
+
+    client = TestClient(app)
+    fleet = pd.read_csv(settings.fleet_risk_csv)
+    assets = fleet[["farm_id", "parquet_file"]].to_dict("records")
+    rng = np.random.default_rng(0)
+
+    def pick() -> Dict[str, str]:
+        return assets[int(rng.integers(len(assets)))]
+
+    cases = {
+        "score_24h": lambda: client.post("/score", json={**pick(), "lookback_hours": 24}),
+        "score_720h": lambda: client.post("/score", json={**pick(), "lookback_hours": 720}),
+        "score_exact_8760h": lambda: client.post("/score", json={**pick(), "lookback_hours": 8760, "exact": True}),
+        "timeseries_4320h": lambda: client.post("/timeseries", json={**pick(), "lookback_hours": 4320, "max_points": 1500}),
+        "fleet": lambda: client.get("/fleet", params={"risk_min": 10, "limit": 50}),
+        "fleet_history_90d": lambda: client.get("/fleet/history", params={"days": 90, "limit": 200}),
+        "assets": lambda: client.get("/assets", params={"farm": pick()["farm_id"]}),
+    }
+
+    out = {}
+    for name, call in cases.items():
+        call()  # warm caches (model load, fleet index)
+        samples = []
+        for _ in range(n_requests):
+            t0 = time.perf_counter()
+            r = call()
+            samples.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                raise RuntimeError(f"{name}: HTTP {r.status_code} {r.text[:200]}")
+        out[name] = percentiles(samples)
+        print(f"[bench] api {name}: p50={out[name]['p50_ms']:.1f}ms p99={out[name]['p99_ms']:.1f}ms", flush=True)
+    return out
+
+
+# cold-start probes, each run in a fresh interpreter
+STARTUP_PROBES = {
+    "api_import": ["-c", "import src.api.main"],
+    "fleet_risk_import": ["-c", "import src.scoring.fleet_risk"],
+    "train_cli_help": ["-m", "src.models.train_isoforest", "--help"],
+    "api_ready": ["-c", (
+        "import time\n"
+        "from fastapi.testclient import TestClient\n"
+        "from src.api.main import app\n"
+        "with TestClient(app) as c:\n"
+        "    while c.get('/ready').json()['status'] == 'starting':\n"
+        "        time.sleep(0.01)\n"
+    )],
+}
+
+
+def run_startup(repeats: int = 3) -> Dict[str, Dict[str, float]]:
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT), "PYTHONWARNINGS": "ignore"}
+    out = {}
+    for name, args in STARTUP_PROBES.items():
+        samples = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, *args], env=env, capture_output=True, check=True)
+            samples.append(time.perf_counter() - t0)
+        out[name] = {"min_s": min(samples), "median_s": float(np.median(samples))}
+        print(f"[bench] startup {name}: {out[name]['median_s']:.2f}s", flush=True)
+    return out
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def flatten(results: Dict[str, Any]) -> Dict[str, float]:
+    """Comparable metrics: stage seconds, startup seconds and API p50/p99."""
+    flat = {f"stage.{k}.seconds": v["seconds"] for k, v in results.get("stages", {}).items()}
+    for k, v in results.get("startup", {}).items():
+        flat[f"startup.{k}.seconds"] = v["median_s"]
+    for k, v in results.get("api", {}).items():
+        flat[f"api.{k}.p50_ms"] = v["p50_ms"]
+        flat[f"api.{k}.p99_ms"] = v["p99_ms"]
+    return flat
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    cur, base = flatten(current), flatten(baseline)
+    print(f"\n{'metric':<40} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for k in sorted(cur):
+        if k in base and base[k] > 0:
+            ratio = cur[k] / base[k]
+            flag = "  <-- slower" if ratio > 1.2 else ""
+            print(f"{k:<40} {base[k]:>10.3f} {cur[k]:>10.3f} {ratio:>6.2f}x{flag}")
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Benchmark the pipeline and API on a synthetic fleet.")
+    ap.add_argument("--workdir", type=Path, default=None, help="where to generate data (default: temp dir)")
+    ap.add_argument("--farms", type=int, default=2)
+    ap.add_argument("--assets", type=int, default=4, help="assets per farm")
+    ap.add_argument("--years", type=float, default=0.5)
+    ap.add_argument("--features", type=parse_features, default=[80, 250])
+    ap.add_argument("--cpus", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--requests", type=int, default=20, help="requests per API case")
+    ap.add_argument("--skip-label", action="store_true", help="label.py loads the whole fleet into memory")
+    ap.add_argument("--skip-api", action="store_true")
+    ap.add_argument("--out", type=Path, default=None, help="results JSON (default: reports/benchmarks/bench_<ts>.json)")
+    ap.add_argument("--baseline", type=Path, default=None, help="previous results JSON to compare against")
+    args = ap.parse_args(argv)
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out_path = (args.out or OUT_DIR / f"bench_{stamp}.json").resolve()
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="wfh_bench_"))
+    workdir = workdir.resolve()
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": stamp,
+            "git_commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": args.cpus,
+            "workdir": str(workdir),
+        },
+    }
+
+    print(f"[bench] generating synthetic fleet in {workdir}", flush=True)
+    t0 = time.perf_counter()
+    results["dataset"] = generate(
+        workdir, args.farms, args.assets, args.years, args.features, write_parquet=False,
+    )
+    results["dataset"]["generate_seconds"] = time.perf_counter() - t0
+
+    with chdir(workdir):
+        results["stages"] = run_stages(args.cpus, with_label=not args.skip_label)
+        results["api"] = {} if args.skip_api else run_api(args.requests)
+        results["startup"] = run_startup()
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(results, indent=2, default=str))
+    print(f"\nSaved: {out_path}")
+
+    if args.baseline:
+        compare(results, json.loads(args.baseline.read_text()))
+
+
+if __name__ == "__main__":
+    main()
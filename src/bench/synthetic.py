@@ -0,0 +1,184 @@
+"""
+Synthetic CARE-to-Compare-shaped fleet for benchmarks: per-farm dataset CSVs, event_info.csv
+and (optionally) per-asset Parquet, laid out the way src/data/load.py and label.py expect.
+
+    python -m src.bench.synthetic --root /tmp/wfh_bench --farms 3 --assets 10 --years 1 --features 80,250,900
+"""
+import argparse
+import string
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+RAW_SUBDIR = Path("data/raw/zenodo/CARE_To_Compare")
+PARQUET_SUBDIR = Path("data/processed/scada_parquet")
+POINTS_PER_DAY = 144  # 10-minute resolution
+ASSET_OFFSET_SD = 0.2  # per-asset sensor offset around the farm level; noise sd is 1
+
+
+def farm_name(i: int) -> str:
+    return f"Wind Farm {string.ascii_uppercase[i]}"
+
+
+def feature_names(n: int) -> List[str]:
+    """sensor_<k>_{avg,max,min,std} blocks like the real data, truncated to n columns."""
+    names = []
+    k = 0
+    while len(names) < n:
+        names.extend(f"sensor_{k}_{s}" for s in ("avg", "max", "min", "std"))
+        k += 1
+    return names[:n]
+
+
+def make_asset_frame(
+    rng: np.random.Generator,
+    asset_id: int,
+    n_rows: int,
+    feats: List[str],
+    farm_level: np.ndarray,
+    farm_amp: np.ndarray,
+    t_end: pd.Timestamp,
+    train_frac: float,
+    n_events: int,
+) -> tuple:
+    """One asset's SCADA history plus the fault events injected into it."""
+    ts = pd.date_range(end=t_end, periods=n_rows, freq="10min")
+
+    # healthy behaviour: the farm's per-sensor level and daily cycle, a small per-asset offset
+    # (well inside the noise, so a farm model sees its held-out assets as normal) + noise
+    level = farm_level + rng.normal(0, ASSET_OFFSET_SD, size=len(feats)).astype(np.float32)
+    amp = farm_amp * rng.uniform(0.9, 1.1, size=len(feats)).astype(np.float32)
+    phase = 2 * np.pi * (np.arange(n_rows) % POINTS_PER_DAY) / POINTS_PER_DAY
+    cycle = np.sin(phase).astype(np.float32)[:, None] * amp
+    X = level + cycle + rng.normal(0, 1, size=(n_rows, len(feats))).astype(np.float32)
+    status = np.zeros(n_rows, dtype=np.int64)
+
+    # faults: a few sensors drift in the days before the event, status flags it abnormal during it
+    events = []
+    for _ in range(n_events):
+        dur = int(rng.integers(POINTS_PER_DAY // 4, POINTS_PER_DAY * 2))
+        start = int(rng.integers(POINTS_PER_DAY * 3, max(POINTS_PER_DAY * 3 + 1, n_rows - dur)))
+        pre = start - POINTS_PER_DAY * 2
+        cols = rng.choice(len(feats), size=max(1, len(feats) // 20), replace=False)
+        ramp = np.linspace(0, 1, start - pre, dtype=np.float32)[:, None]
+        X[pre:start, cols] += 4 * ramp
+        X[start:start + dur, cols] += 6
+        status[start:start + dur] = rng.choice([1, 3, 4, 5])
+        events.append((ts[start], ts[min(start + dur, n_rows - 1)]))
+
+    # a little missingness, like the real exports
+    X[rng.random(X.shape) < 0.001] = np.nan
+
+    n_train = int(train_frac * n_rows)
+    df = pd.DataFrame(X, columns=feats)
+    df.insert(0, "time_stamp", ts)
+    df.insert(1, "asset_id", asset_id)
+    df.insert(2, "id", np.arange(n_rows))
+    df.insert(3, "train_test", np.where(np.arange(n_rows) < n_train, "train", "prediction"))
+    df.insert(4, "status_type_id", status)
+    return df, events
+
+
+def generate(
+    root: Path,
+    n_farms: int = 3,
+    assets_per_farm: int = 5,
+    years: float = 1.0,
+    features: Optional[List[int]] = None,
+    events_per_asset: int = 2,
+    write_csv: bool = True,
+    write_parquet: bool = True,
+    seed: int = 0,
+) -> dict:
+    """
+    Write a synthetic fleet under root. features gives the column count per farm (cycled if shorter
+    than n_farms). Returns a summary dict (rows, bytes, paths).
+    """
+    root = Path(root)
+    features = features or [80, 250, 900]
+    rng = np.random.default_rng(seed)
+    n_rows = int(years * 365 * POINTS_PER_DAY)
+    t_end = pd.Timestamp("2023-12-31 23:50:00")
+
+    raw_root = root / RAW_SUBDIR
+    pq_dir = root / PARQUET_SUBDIR
+    pq_dir.mkdir(parents=True, exist_ok=True)
+
+    total_rows = 0
+    dataset_id = 0
+    for fi in range(n_farms):
+        farm = farm_name(fi)
+        feats = feature_names(features[fi % len(features)])
+        farm_level = rng.normal(0, 5, size=len(feats)).astype(np.float32)
+        farm_amp = rng.uniform(0, 2, size=len(feats)).astype(np.float32)
+        ds_dir = raw_root / farm / "datasets"
+        ds_dir.mkdir(parents=True, exist_ok=True)
+
+        event_rows = []
+        for ai in range(assets_per_farm):
+            # alternate mostly-train and mixed datasets so split.py finds both
+            train_frac = 0.95 if ai % 2 == 0 else 0.85
+            df, events = make_asset_frame(
+                rng, ai, n_rows, feats, farm_level, farm_amp, t_end - pd.Timedelta(days=int(rng.integers(0, 60))),
+                train_frac, events_per_asset,
+            )
+            if write_csv:
+                df.to_csv(ds_dir / f"{dataset_id}.csv", sep=";", index=False)
+            if write_parquet:
+                out = df.rename(columns={"time_stamp": "timestamp"})
+                out["farm_id"] = farm.replace(" ", "_")
+                out["dataset_id"] = str(dataset_id)
+                out.to_parquet(pq_dir / f"{farm.replace(' ', '_')}__{dataset_id}.parquet", index=False)
+
+            for k, (t0, t1) in enumerate(events):
+                event_rows.append({
+                    "event_id": f"{dataset_id}_{k}",
+                    "event_label": "anomaly",
+                    "asset_id": ai,
+                    "event_start": t0,
+                    "event_end": t1,
+                })
+            total_rows += n_rows
+            dataset_id += 1
+
+        pd.DataFrame(event_rows).to_csv(raw_root / farm / "event_info.csv", index=False)
+
+    return {
+        "root": str(root),
+        "n_farms": n_farms,
+        "assets_per_farm": assets_per_farm,
+        "years": years,
+        "features": features[:n_farms],
+        "rows_per_asset": n_rows,
+        "total_rows": total_rows,
+        "raw_bytes": sum(p.stat().st_size for p in raw_root.rglob("*.csv")),
+    }
+
+
+def parse_features(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Generate a synthetic CARE-to-Compare-shaped fleet.")
+    ap.add_argument("--root", type=Path, required=True)
+    ap.add_argument("--farms", type=int, default=3)
+    ap.add_argument("--assets", type=int, default=5, help="assets per farm")
+    ap.add_argument("--years", type=float, default=1.0)
+    ap.add_argument("--features", type=parse_features, default=[80, 250, 900], help="columns per farm, e.g. 80,250,900")
+    ap.add_argument("--events", type=int, default=2, help="fault events per asset")
+    ap.add_argument("--no-parquet", action="store_true")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    summary = generate(
+        args.root, args.farms, args.assets, args.years, args.features, args.events,
+        write_parquet=not args.no_parquet, seed=args.seed,
+    )
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Mapping, Optional
+
+ENV_PREFIX = "WFH_"
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Paths and knobs shared by the pipeline, API and dashboard.
+    Every field can be overridden with an environment variable WFH_<FIELD_NAME>, e.g.
+    WFH_DATA_DIR=/mnt/scada or WFH_API_URL=http://api:8000. Derived paths left unset follow
+    data_dir / model_dir.
+    """
+    # roots
+    raw_root: Path = Path("data/raw/zenodo/CARE_To_Compare")
+    data_dir: Path = Path("data/processed")
+    model_dir: Path = Path("models/baseline")
+    reports_dir: Path = Path("reports")
+
+    # derived (None -> under data_dir / model_dir / reports_dir)
+    parquet_dir: Optional[Path] = None
+    index_csv: Optional[Path] = None
+    catalog_csv: Optional[Path] = None
+    splits_path: Optional[Path] = None
+    fleet_risk_csv: Optional[Path] = None
+    fleet_history_csv: Optional[Path] = None
+    scada_all_path: Optional[Path] = None
+    labeled_path: Optional[Path] = None
+    thresholds_path: Optional[Path] = None
+    metrics_dir: Optional[Path] = None
+
+    # scoring
+    fleet_lookback_hours: int = 24
+    chunk_rows: int = 20_000
+    max_sample_points: int = 50_000
+
+    # serving
+    api_url: str = "http://127.0.0.1:8000"
+    warmup: bool = True          # load heavy libs + models in the background at API startup
+
+    def __post_init__(self):
+        derived = {
+            "parquet_dir": self.data_dir / "scada_parquet",
+            "index_csv": self.data_dir / "scada_index.csv",
+            "catalog_csv": self.data_dir / "dataset_catalog.csv",
+            "splits_path": self.data_dir / "splits" / "file_splits.json",
+            "fleet_risk_csv": self.data_dir / "fleet_risk.csv",
+            "fleet_history_csv": self.data_dir / "fleet_risk_history.csv",
+            "scada_all_path": self.data_dir / "scada_all.parquet",
+            "labeled_path": self.data_dir / "scada_labeled.parquet",
+            "thresholds_path": self.model_dir / "thresholds.json",
+            "metrics_dir": self.reports_dir / "metrics",
+        }
+        for name, default in derived.items():
+            if getattr(self, name) is None:
+                object.__setattr__(self, name, default)
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] = os.environ) -> "Settings":
+        kwargs = {}
+        for f in fields(cls):
+            raw = env.get(ENV_PREFIX + f.name.upper())
+            if raw is None:
+                continue
+            kwargs[f.name] = _parse(raw, cls.__dataclass_fields__[f.name].default, f.name)
+        return cls(**kwargs)
+
+
+def _parse(raw: str, default, name: str):
+    if isinstance(default, bool):
+        if raw.strip().lower() in ("1", "true", "yes", "on"):
+            return True
+        if raw.strip().lower() in ("0", "false", "no", "off"):
+            return False
+        raise ValueError(f"{ENV_PREFIX}{name.upper()}: expected a boolean, got {raw!r}")
+    if isinstance(default, int):
+        return int(raw)
+    if isinstance(default, str):
+        return raw
+    # Path and Optional[Path] fields
+    return Path(raw)
+
+
+settings = Settings.from_env()
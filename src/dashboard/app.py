@@ -65,9 +65,16 @@
 # st.dataframe(top, use_container_width=True, height=320)
 
 # st.divider()
+import sys
+from pathlib import Path
+
 import pandas as pd
 import streamlit as st
-from pathlib import Path
+import requests
+
+# `streamlit run` puts only this script's folder on sys.path; add the repo root for `src.` imports
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from src.config import settings
 
 # 1. CHANGED LAYOUT TO "centered"
 st.set_page_config(page_title="Wind Fleet Health", page_icon="🌀", layout="centered")
@@ -85,66 +92,84 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-RISK_CSV = Path("data/processed/fleet_risk.csv")
+API = settings.api_url
+PAGE_SIZE = 200
+
+# filtering/sorting/paging happens in the API's in-memory fleet index; reruns only fetch one page
+@st.cache_data(ttl=30)
+def api_fleet(farms: tuple = (), risk_min: float = 0.0, risk_max: float = 100.0, offset: int = 0, limit: int = PAGE_SIZE):
+    params = {"risk_min": risk_min, "risk_max": risk_max, "offset": offset, "limit": limit}
+    if farms:
+        params["farm"] = list(farms)
+    r = requests.get(f"{API}/fleet", params=params, timeout=30)
+    r.raise_for_status()
+    return r.json()
 
 st.title("🌀 Wind Fleet Health Monitoring")
 st.caption("Fleet-level anomaly risk scoring (Isolation Forest baseline)")
 
-if not RISK_CSV.exists():
-    st.error(f"Missing {RISK_CSV}. Run: python src/scoring/fleet_risk.py")
+try:
+    meta = api_fleet(limit=1)
+except Exception as e:
+    st.error(f"API call failed. Is uvicorn running on {API}? Error: {e}")
     st.stop()
 
-df = pd.read_csv(RISK_CSV)
-df["t_end"] = pd.to_datetime(df["t_end"], errors="coerce")
-
 # 3. MOVED SIDEBAR FILTERS TO A COLLAPSIBLE EXPANDER
 with st.expander("⚙️ Filter Options", expanded=False):
     c_filt1, c_filt2 = st.columns(2)
-    farms = sorted(df["farm_id"].dropna().unique().tolist())
+    farms = meta["farms"]
     with c_filt1:
         selected_farms = st.multiselect("Farm", farms, default=farms)
 
-    min_risk, max_risk = float(df["risk_score"].min()), float(df["risk_score"].max())
+    min_risk, max_risk = meta["risk_range"]
     with c_filt2:
         risk_range = st.slider("Risk score range", 0.0, 100.0, (max(0.0, min_risk), min(100.0, max_risk)))
 
-df_f = df[
-    (df["farm_id"].isin(selected_farms)) &
-    (df["risk_score"] >= risk_range[0]) &
-    (df["risk_score"] <= risk_range[1])
-].copy()
+if not selected_farms:
+    st.info("Select at least one farm.")
+    st.stop()
 
-# Risk buckets (simple, tune later)
-def bucket(r):
-    if r >= 80: return "High"
-    if r >= 50: return "Medium"
-    return "Low"
+# size the pager from the filtered total so it can't run past the last page
+total = api_fleet(tuple(selected_farms), risk_range[0], risk_range[1], limit=1)["total"]
+page = 0
+if total > PAGE_SIZE:
+    n_pages = -(-total // PAGE_SIZE)
+    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1) - 1
 
-df_f["risk_bucket"] = df_f["risk_score"].apply(bucket)
+resp = api_fleet(tuple(selected_farms), risk_range[0], risk_range[1], offset=int(page * PAGE_SIZE))
+df_f = pd.DataFrame(resp["rows"])
+if not df_f.empty:
+    df_f["t_end"] = pd.to_datetime(df_f["t_end"], errors="coerce")
 
 st.divider()
 
 # KPI row
+summary = resp["summary"]
 c1, c2, c3, c4 = st.columns(4)
-c1.metric("Assets in view", f"{len(df_f)}")
-c2.metric("High risk (≥80)", f"{(df_f['risk_bucket']=='High').sum()}")
-c3.metric("Avg risk", f"{df_f['risk_score'].mean():.1f}")
-c4.metric("Max risk", f"{df_f['risk_score'].max():.1f}" if len(df_f) else "—")
+c1.metric("Assets in view", f"{resp['total']}")
+c2.metric("High risk (≥80)", f"{resp['bucket_counts']['High']}")
+c3.metric("Avg risk", f"{summary['mean_risk']:.1f}" if summary["mean_risk"] is not None else "—")
+c4.metric("Max risk", f"{summary['max_risk']:.1f}" if summary["max_risk"] is not None else "—")
 
 st.divider()
 
 # 4. STACKED LAYOUT (Removed left/right split)
 st.subheader("📊 Risk Distribution")
-st.bar_chart(df_f["risk_bucket"].value_counts())
+st.bar_chart(pd.Series(resp["bucket_counts"]))
 
 st.subheader("📋 Fleet Ranking")
+if df_f.empty:
+    st.write("No assets match the current filters.")
+    st.stop()
+if resp["total"] > PAGE_SIZE:
+    st.caption(f"Showing {resp['offset'] + 1}–{resp['offset'] + len(df_f)} of {resp['total']}")
 show_cols = ["farm_id","asset_id","risk_score","risk_bucket","alert_rate","max_anomaly_score","threshold","n_points_scored","t_end"]
 st.dataframe(
-    df_f.sort_values("risk_score", ascending=False)[show_cols],
+    df_f[show_cols],
     use_container_width=True,
     height=300
 )
 
 st.subheader("⚠️ Top Risky Assets")
-top = df_f.sort_values("risk_score", ascending=False).head(10)[["farm_id","asset_id","risk_score","alert_rate"]]
-st.dataframe(top, use_container_width=True, height=320)
\ No newline at end of file
+top = api_fleet(tuple(selected_farms), risk_range[0], risk_range[1], limit=10)
+st.dataframe(pd.DataFrame(top["rows"])[["farm_id","asset_id","risk_score","alert_rate"]], use_container_width=True, height=320)
\ No newline at end of file
@@ -82,11 +82,17 @@
 
 # st.divider()
 # #st.info("Tip: Keep the API running in another terminal: uvicorn src.api.main:app --reload --port 8000")
+import sys
 from pathlib import Path
+
 import pandas as pd
 import streamlit as st
 import requests
 
+# `streamlit run` puts only this script's folder on sys.path; add the repo root for `src.` imports
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from src.config import settings
+
 # 1. CHANGED LAYOUT TO "centered"
 st.set_page_config(page_title="Asset Drilldown", page_icon="🔍", layout="centered")
 
@@ -103,8 +109,20 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-RISK_CSV = Path("data/processed/fleet_risk.csv")
-API = "http://127.0.0.1:8000"
+API = settings.api_url
+
+# farm/asset lists and coverage come from the API's catalog index
+@st.cache_data(ttl=60)
+def api_farms():
+    r = requests.get(f"{API}/farms", timeout=30)
+    r.raise_for_status()
+    return r.json()["farms"]
+
+@st.cache_data(ttl=60)
+def api_assets(farm_id: str):
+    r = requests.get(f"{API}/assets", params={"farm": [farm_id], "limit": 10000}, timeout=30)
+    r.raise_for_status()
+    return r.json()["rows"]
 
 @st.cache_data(ttl=60)
 def api_score(farm_id: str, parquet_file: str, lookback_hours: int):
@@ -113,31 +131,44 @@ def api_score(farm_id: str, parquet_file: str, lookback_hours: int):
     r.raise_for_status()
     return r.json()
 
+@st.cache_data(ttl=60)
+def api_timeseries(farm_id: str, parquet_file: str, lookback_hours: int, sensors: tuple, max_points: int):
+    payload = {
+        "farm_id": farm_id,
+        "parquet_file": parquet_file,
+        "lookback_hours": lookback_hours,
+        "sensors": list(sensors),
+        "max_points": max_points,
+    }
+    r = requests.post(f"{API}/timeseries", json=payload, timeout=120)
+    r.raise_for_status()
+    return r.json()
+
 st.title("🔍 Asset Drilldown (API)")
 st.caption("Streamlit → FastAPI /score → model inference")
 
-if not RISK_CSV.exists():
-    st.error("Missing data/processed/fleet_risk.csv. Run: python src/scoring/fleet_risk.py")
+try:
+    farms = [f["farm_id"] for f in api_farms()]
+except Exception as e:
+    st.error(f"API call failed. Is uvicorn running on {API}? Error: {e}")
     st.stop()
 
-fleet = pd.read_csv(RISK_CSV)
-fleet["t_end"] = pd.to_datetime(fleet["t_end"], errors="coerce")
-
 # 3. MOVED SIDEBAR INTO A CONFIGURATION MENU
 with st.expander("⚙️ Asset Selection & Configuration", expanded=True):
     col_sel1, col_sel2, col_sel3 = st.columns([1, 1, 2])
     
-    farms = sorted(fleet["farm_id"].dropna().unique().tolist())
     with col_sel1:
         farm_id = st.selectbox("Farm", farms)
 
     with col_sel2:
-        assets = fleet.loc[fleet["farm_id"] == farm_id, "asset_id"].dropna().unique().tolist()
+        catalog = pd.DataFrame(api_assets(farm_id))
+        assets = catalog["asset_id"].dropna().unique().tolist() if not catalog.empty else []
         assets = sorted(assets, key=lambda x: int(x) if str(x).isdigit() else str(x))
         asset_id = st.selectbox("Asset ID", assets)
 
     with col_sel3:
         lookback_days = st.slider("Lookback days", 1, 30, 30)
+        history_days = st.slider("History days (chart)", 7, 730, 180)
 
     run = st.button("Run Score", type="primary", use_container_width=True)
 
@@ -145,12 +176,14 @@ if not run:
     st.info("Select inputs above and click **Run Score** to query the API.")
     st.stop()
 
-row = fleet[(fleet["farm_id"] == farm_id) & (fleet["asset_id"] == asset_id)].head(1)
+# datasets come newest first; score the asset's latest one
+row = catalog[catalog["asset_id"] == asset_id].head(1) if asset_id is not None else catalog.head(0)
 if row.empty:
-    st.error("Could not find asset in fleet_risk.csv")
+    st.error("Could not find asset in dataset_catalog.csv")
     st.stop()
 
 parquet_file = row["parquet_file"].iloc[0]
+st.caption(f"Dataset {parquet_file} · {row['n_rows'].iloc[0]:,} rows · {row['ts_min'].iloc[0]} → {row['ts_max'].iloc[0]}")
 
 # Call API
 try:
@@ -190,4 +223,25 @@ top = pd.DataFrame(resp.get("top_contributors", []))
 if top.empty:
     st.write("No contributors available.")
 else:
-    st.dataframe(top, use_container_width=True, height=380)
\ No newline at end of file
+    st.dataframe(top, use_container_width=True, height=380)
+
+st.divider()
+
+st.subheader("📈 Anomaly score history")
+chart_sensors = tuple(top["feature"].head(3).tolist()) if not top.empty else ()
+try:
+    with st.spinner("Loading downsampled history..."):
+        ts = api_timeseries(farm_id, parquet_file, int(history_days * 24), chart_sensors, 1500)
+except Exception as e:
+    st.warning(f"Could not load history: {e}")
+    st.stop()
+
+hist = pd.DataFrame(ts["columns"])
+hist["timestamp"] = pd.to_datetime(hist["timestamp"], unit="ms")
+hist = hist.set_index("timestamp")
+hist["threshold"] = ts["threshold"]
+st.caption(f"{ts['n_points']} of {ts['n_points_raw']} points ({ts['method']}) · {ts['t_start']} → {ts['t_end']}")
+st.line_chart(hist[["anomaly_score", "threshold"]], height=300)
+if chart_sensors:
+    st.caption("Top contributing sensors")
+    st.line_chart(hist[list(chart_sensors)], height=260)
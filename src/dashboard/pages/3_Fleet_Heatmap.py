@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from src.config import settings
+
+st.set_page_config(page_title="Fleet Heatmap", page_icon="🗓️", layout="centered")
+
+st.markdown(
+    """
+    <style>
+    .block-container {
+        max-width: 1000px !important;
+        padding-top: 2rem;
+    }
+    </style>
+    """,
+    unsafe_allow_html=True
+)
+
+API = settings.api_url
+
+# precomputed by `python -m src.scoring.replay`; the API serves it from memory, no model calls
+@st.cache_data(ttl=60)
+def api_history(farms: tuple = (), days: int = 90, sort_by: str = "latest", limit: int = 200):
+    params = {"days": days, "sort_by": sort_by, "limit": limit}
+    if farms:
+        params["farm"] = list(farms)
+    r = requests.get(f"{API}/fleet/history", params=params, timeout=30)
+    r.raise_for_status()
+    return r.json()
+
+st.title("🗓️ Fleet Risk Heatmap")
+st.caption("Daily replay of the fleet risk score per asset")
+
+try:
+    meta = api_history(days=1, limit=1)
+except Exception as e:
+    st.error(f"API call failed. Is uvicorn running and has `python -m src.scoring.replay` been run? Error: {e}")
+    st.stop()
+
+with st.expander("⚙️ Heatmap Options", expanded=False):
+    c1, c2 = st.columns(2)
+    with c1:
+        selected_farms = st.multiselect("Farm", meta["farms"], default=meta["farms"])
+        sort_by = st.selectbox("Sort assets by", ["latest", "peak", "mean"])
+    with c2:
+        days = st.slider("Days", 7, 730, 90)
+        limit = st.slider("Max assets", 10, 500, 100)
+
+if not selected_farms:
+    st.info("Select at least one farm.")
+    st.stop()
+
+resp = api_history(tuple(selected_farms), days, sort_by, limit)
+if not resp["assets"]:
+    st.write("No assets match the current filters.")
+    st.stop()
+
+labels = [f"{a['farm_id']} · {a['asset_id']}" for a in resp["assets"]]
+st.caption(f"Showing {len(labels)} of {resp['total']} assets · {resp['days'][0]} → {resp['days'][-1]}")
+
+fig = go.Figure(go.Heatmap(
+    z=resp["risk"],
+    x=resp["days"],
+    y=labels,
+    zmin=0,
+    zmax=100,
+    colorscale="YlOrRd",
+    colorbar={"title": "Risk"},
+    hovertemplate="%{y}<br>%{x}<br>risk %{z:.1f}<extra></extra>",
+))
+fig.update_layout(
+    height=max(300, 18 * len(labels) + 120),
+    margin={"l": 10, "r": 10, "t": 10, "b": 10},
+    yaxis={"autorange": "reversed"},
+)
+st.plotly_chart(fig, use_container_width=True)
+
+st.subheader("📈 Fleet trend")
+st.caption(f"All {resp['total']} matching assets, not only the ones shown above")
+trend = pd.DataFrame(
+    {"mean_risk": resp["trend"]["mean_risk"], "assets_high (≥80)": resp["trend"]["n_high"]},
+    index=pd.to_datetime(resp["days"]),
+    dtype=float,
+)
+st.line_chart(trend, height=260)
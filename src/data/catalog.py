@@ -1,12 +1,13 @@
 import pandas as pd
-from pathlib import Path
 import logging
 
+from src.config import settings
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
 
-PARQUET_DIR = Path("data/processed/scada_parquet")
-INDEX_CSV = Path("data/processed/scada_index.csv")
-OUT_CSV = Path("data/processed/dataset_catalog.csv")
+PARQUET_DIR = settings.parquet_dir
+INDEX_CSV = settings.index_csv
+OUT_CSV = settings.catalog_csv
 
 def main():
     idx = pd.read_csv(INDEX_CSV)
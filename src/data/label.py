@@ -1,11 +1,12 @@
 # src/data/label.py
 import pandas as pd
-from pathlib import Path
 import logging
 
-RAW_ROOT = Path("data/raw/zenodo/CARE_To_Compare")
-SCADA_PATH = Path("data/processed/scada_all.parquet")
-OUT_PATH = Path("data/processed/scada_labeled.parquet")
+from src.config import settings
+
+RAW_ROOT = settings.raw_root
+SCADA_PATH = settings.scada_all_path
+OUT_PATH = settings.labeled_path
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
 
@@ -4,9 +4,11 @@ from pathlib import Path
 from typing import List
 import logging
 
-RAW_ROOT = Path("data/raw/zenodo/CARE_To_Compare")
-OUT_DIR = Path("data/processed/scada_parquet")   # per-file parquet output
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+from src.config import settings
+
+RAW_ROOT = settings.raw_root
+OUT_DIR = settings.parquet_dir   # per-file parquet output
+INDEX_CSV = settings.index_csv
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
 
@@ -47,6 +49,7 @@ def load_single_dataset_csv(path: Path) -> pd.DataFrame:
     return df
 
 def main():
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
     csvs = discover_dataset_csvs()
     written = 0
 
@@ -68,7 +71,7 @@ def main():
             logging.warning(f"Skipping {csv_path}: {e}")
 
     # Create an index so we can load all parquet files later efficiently
-    index_path = Path("data/processed/scada_index.csv")
+    index_path = INDEX_CSV
     pd.DataFrame({"parquet_file": sorted([p.name for p in OUT_DIR.glob("*.parquet")])}).to_csv(index_path, index=False)
 
     logging.info(f"Done. Parquet written: {written}")
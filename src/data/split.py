@@ -1,10 +1,10 @@
 import pandas as pd
-from pathlib import Path
 import json
 
-CATALOG = Path("data/processed/dataset_catalog.csv")
-OUT_DIR = Path("data/processed/splits")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
+from src.config import settings
+
+CATALOG = settings.catalog_csv
+OUT_PATH = settings.splits_path
 
 def main():
     cat = pd.read_csv(CATALOG)
@@ -26,10 +26,11 @@ def main():
             "test": test_files
         }
 
-    with open(OUT_DIR / "file_splits.json", "w") as f:
+    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(OUT_PATH, "w") as f:
         json.dump(splits, f, indent=2)
 
-    print("Saved splits to", OUT_DIR / "file_splits.json")
+    print("Saved splits to", OUT_PATH)
     for farm, s in splits.items():
         print(f"{farm}: train={len(s['train'])}, test={len(s['test'])}")
 
@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.config import settings
+from src.scoring.risk import FILL_VALUE, feature_matrix
+
+PARQUET_DIR = settings.parquet_dir
+SPLITS_PATH = settings.splits_path
+OUT_DIR = settings.model_dir
+
+RANDOM_STATE = 42
+N_ESTIMATORS = 200
+
+MAX_TRAIN_ROWS = 200_000     # healthy rows sampled for training per farm
+MAX_TEST_ROWS = 200_000      # rows sampled for evaluation per farm
+NON_FEATURES = {"id", "asset_id", "dataset_id", "status_type_id"}   # row/turbine/dataset ids and the label
+SCORE_QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.995, 0.999)
+
+
+def load_feature_cols(sample_file: Path) -> List[str]:
+    """Numeric columns of one file, minus obvious non-features (schema only, no data read)."""
+    schema = pq.read_schema(sample_file)
+    return [
+        f.name for f in schema
+        if (pa.types.is_integer(f.type) or pa.types.is_floating(f.type)) and f.name not in NON_FEATURES
+    ]
+
+
+class Reservoir:
+    """
+    Uniform sample without replacement of up to k rows from a stream.
+    Every row gets a uniform random key and the k smallest keys are kept, so reservoirs built
+    independently per file (in any order, in parallel) merge into an unbiased sample of all rows.
+    """
+
+    def __init__(self, k: int, n_cols: int):
+        self.k = k
+        self.keys = np.empty(0, dtype=np.float64)
+        self.X = np.empty((0, n_cols), dtype=np.float32)
+        self.y = np.empty(0, dtype=np.int8)
+        self.n_seen = 0
+
+    def offer(self, X: np.ndarray, y: np.ndarray, keys: np.ndarray) -> None:
+        self.n_seen += len(keys)
+        self._keep(
+            np.concatenate([self.keys, keys]),
+            np.concatenate([self.X, X]),
+            np.concatenate([self.y, y]),
+        )
+
+    def merge(self, other: "Reservoir") -> None:
+        n_seen = self.n_seen + other.n_seen
+        self.offer(other.X, other.y, other.keys)
+        self.n_seen = n_seen
+
+    def _keep(self, keys: np.ndarray, X: np.ndarray, y: np.ndarray) -> None:
+        if len(keys) > self.k:
+            idx = np.argpartition(keys, self.k - 1)[: self.k]
+            keys, X, y = keys[idx], X[idx], y[idx]
+        self.keys, self.X, self.y = keys, X, y
+
+    def sorted(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Sample in key order, so downstream fits don't depend on merge order."""
+        order = np.argsort(self.keys, kind="stable")
+        return self.X[order], self.y[order]
+
+
+def scan_file(
+    fname: str,
+    seed: int,
+    feature_cols: List[str],
+    for_train: bool,
+    for_eval: bool,
+) -> Tuple[Reservoir, Reservoir, int]:
+    """Read one file once and feed both the healthy-train and the eval reservoir from it."""
+    available = set(pq.read_schema(PARQUET_DIR / fname).names)
+    cols = [c for c in feature_cols if c in available]
+    df = pd.read_parquet(PARQUET_DIR / fname, columns=cols + ["status_type_id"])
+
+    # same alignment + NaN fill as every serving path, so the model never sees raw NaNs
+    X = feature_matrix(df, feature_cols)
+    y = (df["status_type_id"] != 0).to_numpy(dtype=np.int8)
+    rng = np.random.default_rng([RANDOM_STATE, seed])
+
+    train = Reservoir(MAX_TRAIN_ROWS, len(feature_cols))
+    evals = Reservoir(MAX_TEST_ROWS, len(feature_cols))
+    if for_train:
+        healthy = y == 0
+        train.offer(X[healthy], y[healthy], rng.random(int(healthy.sum())))
+    if for_eval:
+        evals.offer(X, y, rng.random(len(y)))
+    return train, evals, len(df)
+
+
+def collect_farm(farm: str, sp: Dict[str, List[str]], feature_cols: List[str], io_threads: int):
+    """
+    One parallel pass over the farm's files: each file is read exactly once, even when it
+    serves both training and evaluation.
+    """
+    train_files = set(sp["train"])
+    eval_files = set(sp["test"] if len(sp["test"]) > 0 else sp["train"][-5:])
+    files = sorted(train_files | eval_files)
+
+    train = Reservoir(MAX_TRAIN_ROWS, len(feature_cols))
+    evals = Reservoir(MAX_TEST_ROWS, len(feature_cols))
+    n_rows = 0
+    with ThreadPoolExecutor(max_workers=io_threads) as pool:
+        futs = [
+            pool.submit(scan_file, f, i, feature_cols, f in train_files, f in eval_files)
+            for i, f in enumerate(files)
+        ]
+        for fut in as_completed(futs):
+            t, e, n = fut.result()
+            train.merge(t)
+            evals.merge(e)
+            n_rows += n
+
+    return train, evals, {"n_files": len(files), "n_rows_read": n_rows}
+
+
+def train_farm(farm: str, sp: Dict[str, List[str]], n_jobs: int, io_threads: int, version: str) -> Dict[str, Any]:
+    # sklearn/joblib are only needed in the farm workers; keeps CLI startup (and --help) fast
+    import joblib
+    from sklearn.ensemble import IsolationForest
+    from sklearn.metrics import roc_auc_score
+
+    timings = {}
+
+    if not sp["train"]:
+        raise RuntimeError(f"{farm}: no train files in {SPLITS_PATH.name}.")
+
+    t0 = time.perf_counter()
+    feature_cols = load_feature_cols(PARQUET_DIR / sp["train"][0])
+    train, evals, read_stats = collect_farm(farm, sp, feature_cols, io_threads)
+    X_train, _ = train.sorted()
+    X_test, y_test = evals.sorted()
+    timings["read_s"] = time.perf_counter() - t0
+    if len(X_train) == 0:
+        raise RuntimeError(f"{farm}: no healthy rows found for training.")
+
+    t0 = time.perf_counter()
+    model = IsolationForest(
+        n_estimators=N_ESTIMATORS,
+        contamination="auto",
+        random_state=RANDOM_STATE,
+        n_jobs=n_jobs,
+    )
+    model.fit(X_train)
+    timings["fit_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    train_scores = -model.score_samples(X_train)
+    scores = -model.score_samples(X_test) if len(X_test) else np.empty(0)
+    auc = float(roc_auc_score(y_test, scores)) if len(np.unique(y_test)) == 2 else None
+    timings["eval_s"] = time.perf_counter() - t0
+
+    train_stats = {
+        **read_stats,
+        "n_healthy_seen": int(train.n_seen),
+        "n_train": int(len(X_train)),
+        "n_eval_seen": int(evals.n_seen),
+        "n_eval": int(len(X_test)),
+        "eval_positive_rate": float(y_test.mean()) if len(y_test) else None,
+        "roc_auc": auc,
+        "feature_mean": np.nanmean(X_train, axis=0).astype(float).tolist(),
+        "feature_std": np.nanstd(X_train, axis=0).astype(float).tolist(),
+        "train_score_quantiles": {str(q): float(np.quantile(train_scores, q)) for q in SCORE_QUANTILES},
+    }
+    pack = {
+        "model": model,
+        "features": feature_cols,
+        "version": version,
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "params": {"n_estimators": N_ESTIMATORS, "random_state": RANDOM_STATE,
+                   "max_train_rows": MAX_TRAIN_ROWS, "max_test_rows": MAX_TEST_ROWS,
+                   "fill_value": FILL_VALUE},
+        "train_stats": train_stats,
+        "timings": timings,
+    }
+
+    # versioned copy first, then swap the path consumers load (fleet_risk.py, the API)
+    versioned = OUT_DIR / "versions" / f"isoforest_{farm}__{version}.joblib"
+    versioned.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(pack, versioned)
+    tmp = OUT_DIR / f".isoforest_{farm}.joblib.tmp"
+    shutil.copyfile(versioned, tmp)
+    os.replace(tmp, OUT_DIR / f"isoforest_{farm}.joblib")
+
+    return {
+        "farm_id": farm,
+        "version": version,
+        "pack": str(versioned),
+        "n_features": len(feature_cols),
+        "train_shape": list(X_train.shape),
+        "roc_auc": auc,
+        "timings": timings,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Train per-farm IsolationForest packs.")
+    ap.add_argument("--cpus", type=int, default=os.cpu_count() or 1, help="total CPU budget")
+    ap.add_argument("--farm-workers", type=int, default=None, help="farms trained concurrently (default: min(#farms, cpus))")
+    ap.add_argument("--farms", nargs="*", default=None, help="subset of farms to train")
+    args = ap.parse_args(argv)
+
+    splits = json.loads(SPLITS_PATH.read_text())
+    if args.farms:
+        splits = {f: sp for f, sp in splits.items() if f in args.farms}
+    if not splits:
+        raise SystemExit("No farms to train.")
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    farm_workers = max(1, min(args.farm_workers or len(splits), len(splits), args.cpus))
+    n_jobs = max(1, args.cpus // farm_workers)
+    print(f"Training {len(splits)} farms: {farm_workers} concurrent x {n_jobs} CPUs each (version {version})")
+
+    t0 = time.perf_counter()
+    results, failed = [], {}
+    with ProcessPoolExecutor(max_workers=farm_workers) as pool:
+        futs = {pool.submit(train_farm, farm, sp, n_jobs, n_jobs, version): farm for farm, sp in splits.items()}
+        for fut in as_completed(futs):
+            # one farm failing must not abort the others or skip the manifest
+            try:
+                r = fut.result()
+            except Exception as e:
+                failed[futs[fut]] = repr(e)
+                print(f"{futs[fut]}: FAILED {e!r}")
+                continue
+            results.append(r)
+            t = r["timings"]
+            auc = f"{r['roc_auc']:.4f}" if r["roc_auc"] is not None else "n/a"
+            print(f"{r['farm_id']}: train={tuple(r['train_shape'])} ROC-AUC={auc} "
+                  f"read={t['read_s']:.1f}s fit={t['fit_s']:.1f}s eval={t['eval_s']:.1f}s")
+
+    manifest = {
+        "version": version,
+        "cpus": args.cpus,
+        "farm_workers": farm_workers,
+        "total_s": time.perf_counter() - t0,
+        "farms": sorted(results, key=lambda r: r["farm_id"]),
+        "failed": failed,
+    }
+    manifest_path = OUT_DIR / "versions" / f"manifest__{version}.json"
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    print("Saved:", manifest_path)
+    if failed:
+        raise SystemExit(f"{len(failed)} farm(s) failed: {', '.join(sorted(failed))}")
+
+
+if __name__ == "__main__":
+    main()
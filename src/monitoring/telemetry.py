@@ -0,0 +1,215 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Callable, Iterator, Tuple
+
+# seconds; covers a sub-ms dict lookup up to a full-year exact score
+BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(d: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in d.items()))
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_S)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        for i, b in enumerate(BUCKETS_S):
+            if v <= b:
+                self.counts[i] += 1
+                break
+        self.sum += v
+        self.count += 1
+
+
+class Registry:
+    """
+    In-process histograms + counters, rendered as Prometheus text.
+    Cheap enough to stay always on: one lock and a few adds per observation.
+    """
+
+    def __init__(self, prefix: str = "wfh"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._hists: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, str, Dict[str, Any], float]]]] = []
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            h = self._hists.get(key)
+            if h is None:
+                h = self._hists[key] = _Histogram()
+            h.observe(seconds)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def register_collector(self, fn: Callable[[], List[Tuple[str, str, Dict[str, Any], float]]]) -> None:
+        """fn() -> [(name, type, labels, value)], evaluated at render time (e.g. lru_cache stats)."""
+        self._collectors.append(fn)
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            items = [(dict(k[1]).get("stage"), h.count, h.sum) for k, h in self._hists.items() if k[0] == "stage_seconds"]
+        out: Dict[str, Dict[str, float]] = {}
+        for st, n, total in items:
+            agg = out.setdefault(st, {"count": 0, "total_s": 0.0})
+            agg["count"] += n
+            agg["total_s"] += total
+        for agg in out.values():
+            agg["mean_ms"] = 1000 * agg["total_s"] / agg["count"] if agg["count"] else 0.0
+        return out
+
+    def render(self) -> str:
+        p = self.prefix
+        lines: List[str] = []
+        with self._lock:
+            hists = sorted(self._hists.items())
+            counters = sorted(self._counters.items())
+
+        seen = set()
+        for (name, labels), h in hists:
+            if name not in seen:
+                lines.append(f"# TYPE {p}_{name} histogram")
+                seen.add(name)
+            cum = 0
+            for b, c in zip(BUCKETS_S, h.counts):
+                cum += c
+                lines.append(f"{p}_{name}_bucket{_fmt_labels(labels, ('le', repr(b)))} {cum}")
+            lines.append(f"{p}_{name}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {h.count}")
+            lines.append(f"{p}_{name}_sum{_fmt_labels(labels)} {h.sum}")
+            lines.append(f"{p}_{name}_count{_fmt_labels(labels)} {h.count}")
+
+        for (name, labels), v in counters:
+            if name not in seen:
+                lines.append(f"# TYPE {p}_{name} counter")
+                seen.add(name)
+            lines.append(f"{p}_{name}{_fmt_labels(labels)} {v}")
+
+        for fn in self._collectors:
+            for name, typ, labels, v in fn():
+                if name not in seen:
+                    lines.append(f"# TYPE {p}_{name} {typ}")
+                    seen.add(name)
+                lines.append(f"{p}_{name}{_fmt_labels(_labels(labels))} {v}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# per-request stage list, set only while a request asked for profiling
+_profile: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("wfh_profile", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a hot-path stage into the stage_seconds histogram (and the request profile, if on)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        REGISTRY.observe("stage_seconds", dt, stage=name)
+        prof = _profile.get()
+        if prof is not None:
+            prof.append((name, dt))
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    REGISTRY.inc(name, value, **labels)
+
+
+def rows_scored(n: int, seconds: float, source: str) -> None:
+    REGISTRY.inc("rows_scored_total", n, source=source)
+    REGISTRY.inc("scoring_seconds_total", seconds, source=source)
+
+
+class Profile:
+    """Opt-in stage breakdown for one request; stage() calls inside the block are recorded."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.stages: List[Tuple[str, float]] = []
+        self._t0 = 0.0
+        self._total = 0.0
+        self._token = None
+
+    def __enter__(self) -> "Profile":
+        self._t0 = time.perf_counter()
+        if self.enabled:
+            self._token = _profile.set(self.stages)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._total = time.perf_counter() - self._t0
+        if self._token is not None:
+            _profile.reset(self._token)
+
+    def report(self) -> Dict[str, Any]:
+        total = self._total or (time.perf_counter() - self._t0)
+        by_stage: Dict[str, Dict[str, float]] = {}
+        for name, dt in self.stages:
+            s = by_stage.setdefault(name, {"ms": 0.0, "calls": 0})
+            s["ms"] += 1000 * dt
+            s["calls"] += 1
+        accounted = sum(s["ms"] for s in by_stage.values())
+        return {
+            "total_ms": 1000 * total,
+            "stages": by_stage,
+            "other_ms": max(0.0, 1000 * total - accounted),
+        }
+
+
+def _derived_rates() -> List[Tuple[str, str, Dict[str, Any], float]]:
+    out = []
+    with REGISTRY._lock:
+        counters = dict(REGISTRY._counters)
+    for (name, labels), rows in counters.items():
+        if name != "rows_scored_total":
+            continue
+        secs = counters.get(("scoring_seconds_total", labels), 0.0)
+        if secs > 0:
+            out.append(("rows_scored_per_second", "gauge", dict(labels), rows / secs))
+    return out
+
+
+REGISTRY.register_collector(_derived_rates)
+
+
+def write_textfile(path: Path) -> None:
+    """Prometheus textfile-collector output for batch jobs."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(REGISTRY.render())
+    tmp.replace(path)
+
+
+def print_stage_summary() -> None:
+    summary = REGISTRY.stage_summary()
+    if not summary:
+        return
+    print(f"{'stage':<20} {'calls':>7} {'total_s':>9} {'mean_ms':>9}")
+    for name, s in sorted(summary.items(), key=lambda kv: -kv[1]["total_s"]):
+        print(f"{name:<20} {int(s['count']):>7} {s['total_s']:>9.3f} {s['mean_ms']:>9.2f}")
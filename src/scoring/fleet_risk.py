@@ -1,33 +1,80 @@
 
 import json
+import os
+import time
 from pathlib import Path
+
 import numpy as np
 import pandas as pd
-import joblib
-
-PARQUET_DIR = Path("data/processed/scada_parquet")
-INDEX_CSV = Path("data/processed/scada_index.csv")
-THR_PATH = Path("models/baseline/thresholds.json")
-MODEL_DIR = Path("models/baseline")
-OUT_CSV = Path("data/processed/fleet_risk.csv")
-
-HOURS_LOOKBACK = 24
-
-def align_features(df: pd.DataFrame, feats: list[str]) -> pd.DataFrame:
-    # add missing expected columns
-    for c in feats:
-        if c not in df.columns:
-            df[c] = 0.0
-    # select + order exactly
-    return df[feats]
-
-def compute_risk(scores: np.ndarray, threshold: float):
-    alerts = (scores >= threshold).astype(int)
-    alert_rate = float(alerts.mean()) if len(alerts) else 0.0
-    max_score = float(scores.max()) if len(scores) else 0.0
-    # risk score: simple blend (tune later)
-    risk = 100 * (0.7 * alert_rate + 0.3 * (max_score / (threshold + 1e-6)))
-    return float(np.clip(risk, 0, 100)), alert_rate, max_score
+
+from src.config import settings
+from src.monitoring.telemetry import stage, rows_scored, print_stage_summary, write_textfile
+from src.scoring.risk import feature_matrix, compute_risk, load_pack
+
+PARQUET_DIR = settings.parquet_dir
+INDEX_CSV = settings.index_csv
+THR_PATH = settings.thresholds_path
+OUT_CSV = settings.fleet_risk_csv
+METRICS_PATH = settings.metrics_dir / "fleet_risk.prom"
+
+HOURS_LOOKBACK = settings.fleet_lookback_hours
+COLUMNS = [
+    "farm_id", "parquet_file", "asset_id", "t_end", "lookback_hours", "risk_score",
+    "alert_rate", "max_anomaly_score", "threshold", "n_points_scored",
+]
+
+def score_asset(fname: str, farm_id: str, model, feats: list[str], threshold: float):
+    """Risk over the last HOURS_LOOKBACK hours of one parquet file; None if it has no rows there."""
+    # load only what's needed
+    with stage("read_parquet"):
+        df = pd.read_parquet(PARQUET_DIR / fname, columns=list(set(feats + ["timestamp", "asset_id"])))
+    with stage("to_datetime"):
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        df = df.dropna(subset=["timestamp"])
+    if df.empty:
+        return None
+
+    # last 24 hours slice
+    tmax = df["timestamp"].max()
+    tmin = tmax - pd.Timedelta(hours=HOURS_LOOKBACK)
+    recent = df[df["timestamp"] >= tmin]
+    if recent.empty:
+        return None
+
+    with stage("align_features"):
+        X = feature_matrix(recent, feats)
+
+    t0 = time.perf_counter()
+    with stage("score_samples"):
+        scores = -model.score_samples(X)
+    rows_scored(len(X), time.perf_counter() - t0, source="fleet_risk")
+
+    risk, alert_rate, max_score = compute_risk(scores, threshold)
+
+    return {
+        "farm_id": farm_id,
+        "parquet_file": fname,
+        "asset_id": recent["asset_id"].iloc[0],
+        "t_end": tmax,
+        "lookback_hours": HOURS_LOOKBACK,
+        "risk_score": risk,
+        "alert_rate": alert_rate,
+        "max_anomaly_score": max_score,
+        "threshold": threshold,
+        "n_points_scored": int(len(scores)),
+    }
+
+def write_csv_atomic(df: pd.DataFrame, path: Path) -> None:
+    """Write-then-rename, so readers (the API's reloading indexes) never see a half-written file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+def write_fleet_risk(out: pd.DataFrame, path: Path = OUT_CSV) -> pd.DataFrame:
+    out = out.sort_values("risk_score", ascending=False)
+    write_csv_atomic(out, path)
+    return out
 
 def main():
     if not THR_PATH.exists():
@@ -42,55 +89,14 @@ def main():
         if farm_id not in thr:
             continue
 
-        model_pack = joblib.load(MODEL_DIR / f"isoforest_{farm_id}.joblib")
-        model = model_pack["model"]
-        feats = list(model_pack["features"])
-
-        # 🔒 ensure feature list length matches fitted model
-        n_expected = int(getattr(model, "n_features_in_", len(feats)))
-        if len(feats) != n_expected:
-            # keep it deterministic
-            feats = feats[:n_expected]
-
+        model, feats = load_pack(farm_id)
         threshold = float(thr[farm_id]["threshold"])
 
-        # load only what's needed
-        df = pd.read_parquet(PARQUET_DIR / fname, columns=list(set(feats + ["timestamp", "asset_id"])))
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-        df = df.dropna(subset=["timestamp"])
-        if df.empty:
-            continue
-
-        # last 24 hours slice
-        tmax = df["timestamp"].max()
-        tmin = tmax - pd.Timedelta(hours=HOURS_LOOKBACK)
-        recent = df[df["timestamp"] >= tmin]
-        if recent.empty:
-            continue
-
-        Xdf = align_features(recent, feats).fillna(0.0)
-        X = Xdf.to_numpy(dtype=np.float32, copy=False)
+        row = score_asset(fname, farm_id, model, feats, threshold)
+        if row is not None:
+            rows.append(row)
 
-        scores = -model.score_samples(X)
-
-        risk, alert_rate, max_score = compute_risk(scores, threshold)
-
-        rows.append({
-            "farm_id": farm_id,
-            "parquet_file": fname,
-            "asset_id": recent["asset_id"].iloc[0],
-            "t_end": tmax,
-            "lookback_hours": HOURS_LOOKBACK,
-            "risk_score": risk,
-            "alert_rate": alert_rate,
-            "max_anomaly_score": max_score,
-            "threshold": threshold,
-            "n_points_scored": int(len(scores)),
-        })
-
-    out = pd.DataFrame(rows).sort_values("risk_score", ascending=False)
-    OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(OUT_CSV, index=False)
+    out = write_fleet_risk(pd.DataFrame(rows, columns=COLUMNS))
 
     print("Saved:", OUT_CSV)
     if len(out):
@@ -98,5 +104,9 @@ def main():
     else:
         print("No rows written. Check thresholds/models/parquet paths.")
 
+    print_stage_summary()
+    write_textfile(METRICS_PATH)
+    print("Metrics:", METRICS_PATH)
+
 if __name__ == "__main__":
     main()
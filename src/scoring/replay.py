@@ -0,0 +1,149 @@
+"""
+Historical fleet-risk replay: score each asset's full history once, then evaluate the
+fleet_risk window (lookback_hours ending at each day boundary) for every day from running
+hourly aggregates. Writes an asset × day risk matrix for the dashboard heatmap.
+
+    python -m src.scoring.replay
+    python -m src.scoring.replay --lookback-hours 72 --farms Wind_Farm_A Wind_Farm_B
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.config import settings
+from src.monitoring.telemetry import stage, print_stage_summary, write_textfile
+from src.scoring.fleet_risk import load_pack, write_csv_atomic
+from src.scoring.risk import blend_risk_array
+from src.scoring.streaming import plan_window, iter_scored_chunks
+
+PARQUET_DIR = settings.parquet_dir
+INDEX_CSV = settings.index_csv
+THR_PATH = settings.thresholds_path
+OUT_CSV = settings.fleet_history_csv
+METRICS_PATH = settings.metrics_dir / "replay.prom"
+
+ID_COLS = ["farm_id", "parquet_file", "asset_id"]
+HOUR = np.timedelta64(1, "h")
+
+
+def score_history(path: Path, model, feats: List[str]) -> Tuple[np.ndarray, np.ndarray, Optional[str]]:
+    """Every timestamped row of the file scored once. Returns (timestamps, scores, asset_id), time-ordered."""
+    plan = plan_window(path, t_start=pd.Timestamp.min)   # whole file
+    ts, scores, asset_id = [], [], None
+    for pos, df, s in iter_scored_chunks(path, model, feats, plan, ("asset_id",)):
+        ts.append(plan.ts[pos])
+        scores.append(s)
+        if asset_id is None and "asset_id" in df.columns and len(df):
+            asset_id = str(df["asset_id"].iloc[0])
+    ts, scores = np.concatenate(ts), np.concatenate(scores)
+    order = np.argsort(ts, kind="stable")
+    return ts[order], scores[order], asset_id
+
+
+def sliding_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    out[i] = max(values[i - window + 1 : i + 1]) (shorter at the start), in O(n) with
+    block prefix/suffix maxima (van Herk / Gil-Werman).
+    """
+    n = len(values)
+    if window <= 1 or n == 0:
+        return values.copy()
+    pad = (-(n + window - 1)) % window
+    x = np.concatenate([np.full(window - 1, -np.inf), values, np.full(pad, -np.inf)]).reshape(-1, window)
+    prefix = np.maximum.accumulate(x, axis=1).ravel()
+    suffix = np.maximum.accumulate(x[:, ::-1], axis=1)[:, ::-1].ravel()
+    i = np.arange(n)
+    return np.maximum(suffix[i], prefix[i + window - 1])
+
+
+def daily_risk(
+    ts: np.ndarray,
+    scores: np.ndarray,
+    threshold: float,
+    lookback_hours: int,
+) -> pd.Series:
+    """
+    Risk for the window [day_end - lookback_hours, day_end) at every midnight from the first to
+    the day after the last row, indexed by the day that ends there. Rows are binned by hour, so
+    each window is a whole number of bins: counts come from cumulative sums and the max score
+    from a sliding max over the hourly maxima. NaN where the window holds no rows.
+    """
+    day0 = ts[0].astype("datetime64[D]")
+    n_days = int((ts[-1].astype("datetime64[D]") - day0).astype(int)) + 1
+    n_hours = n_days * 24
+    h = ((ts - day0.astype("datetime64[ns]")) // HOUR).astype(np.int64)
+
+    count = np.bincount(h, minlength=n_hours)
+    alerts = np.bincount(h, weights=(scores >= threshold), minlength=n_hours)
+    hour_max = np.full(n_hours, -np.inf)
+    np.maximum.at(hour_max, h, scores)
+
+    ends = np.arange(1, n_days + 1) * 24      # exclusive hour bin at each day boundary
+    starts = np.maximum(ends - lookback_hours, 0)
+    c_count = np.concatenate([[0], np.cumsum(count)])
+    c_alerts = np.concatenate([[0.0], np.cumsum(alerts)])
+    n = c_count[ends] - c_count[starts]
+    max_score = sliding_max(hour_max, lookback_hours)[ends - 1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        alert_rate = (c_alerts[ends] - c_alerts[starts]) / n
+    risk = np.where(n > 0, blend_risk_array(alert_rate, max_score, threshold), np.nan)
+
+    days = pd.date_range(pd.Timestamp(day0), periods=n_days, freq="D").strftime("%Y-%m-%d")
+    return pd.Series(risk, index=days)
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Replay fleet risk at every day boundary into an asset × day matrix.")
+    ap.add_argument("--lookback-hours", type=int, default=settings.fleet_lookback_hours)
+    ap.add_argument("--farms", nargs="*", default=None, help="subset of farms to replay")
+    ap.add_argument("--out", type=Path, default=OUT_CSV)
+    args = ap.parse_args(argv)
+
+    if not THR_PATH.exists():
+        raise FileNotFoundError(f"Missing {THR_PATH}. Run: python src/models/thresholding.py")
+
+    thr = json.loads(THR_PATH.read_text())
+    idx = pd.read_csv(INDEX_CSV)
+
+    packs: Dict[str, Tuple[Any, List[str]]] = {}
+    ids, series = [], []
+    for fname in idx["parquet_file"]:
+        farm_id = fname.split("__")[0]
+        if farm_id not in thr or (args.farms and farm_id not in args.farms):
+            continue
+        if farm_id not in packs:
+            packs[farm_id] = load_pack(farm_id)
+        model, feats = packs[farm_id]
+        threshold = float(thr[farm_id]["threshold"])
+
+        try:
+            ts, scores, asset_id = score_history(PARQUET_DIR / fname, model, feats)
+        except ValueError:   # no timestamped rows
+            continue
+        with stage("replay_windows"):
+            series.append(daily_risk(ts, scores, threshold, args.lookback_hours))
+        ids.append({"farm_id": farm_id, "parquet_file": fname, "asset_id": asset_id})
+        print(f"{fname}: {len(scores)} rows, {len(series[-1])} days")
+
+    if not series:
+        print("No rows written. Check thresholds/models/parquet paths.")
+        return
+
+    with stage("replay_matrix"):
+        matrix = pd.concat(series, axis=1).T.sort_index(axis=1).round(1)
+        out = pd.concat([pd.DataFrame(ids, columns=ID_COLS), matrix.reset_index(drop=True)], axis=1)
+    write_csv_atomic(out, args.out)
+
+    print(f"Saved: {args.out} ({len(out)} assets × {matrix.shape[1]} days, lookback {args.lookback_hours}h)")
+    print_stage_summary()
+    write_textfile(METRICS_PATH)
+    print("Metrics:", METRICS_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Model-pack loading, feature alignment and the risk formula, shared by every scoring path (API /score
+and /timeseries, batch fleet_risk, sharded workers, replay, exact streaming) so they can't drift apart.
+"""
+from typing import Any, List, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.config import settings
+from src.monitoring.telemetry import stage, inc
+
+FILL_VALUE = 0.0   # missing sensors / NaNs, in training and serving alike
+
+
+def load_pack(farm_id: str) -> Tuple[Any, List[str]]:
+    """(model, feature list) of a farm's canonical model pack."""
+    with stage("joblib_load"):
+        pack = joblib.load(settings.model_dir / f"isoforest_{farm_id}.joblib")
+    inc("model_loads_total", farm=farm_id)
+    model = pack["model"]
+    feats = list(pack["features"])
+    # ensure the feature list matches what the model was fitted on (deterministically)
+    n_expected = int(getattr(model, "n_features_in_", len(feats)))
+    return model, feats[:n_expected]
+
+
+def align_features(df: pd.DataFrame, feats: List[str]) -> pd.DataFrame:
+    # add missing expected columns
+    for c in feats:
+        if c not in df.columns:
+            df[c] = FILL_VALUE
+    # select + order exactly
+    return df[feats]
+
+
+def feature_matrix(df: pd.DataFrame, feats: List[str]) -> np.ndarray:
+    """Model input: aligned features with NaNs filled, as float32."""
+    return align_features(df, feats).fillna(FILL_VALUE).to_numpy(dtype=np.float32, copy=False)
+
+
+def blend_risk_array(alert_rate: np.ndarray, max_score: np.ndarray, threshold: float) -> np.ndarray:
+    # risk score: simple blend (tune later)
+    risk = 100 * (0.7 * alert_rate + 0.3 * (max_score / (threshold + 1e-6)))
+    return np.clip(risk, 0, 100)
+
+
+def blend_risk(alert_rate: float, max_score: float, threshold: float) -> float:
+    return float(blend_risk_array(alert_rate, max_score, threshold))
+
+
+def compute_risk(scores: np.ndarray, threshold: float) -> Tuple[float, float, float]:
+    """(risk_score, alert_rate, max_anomaly_score) over a window of anomaly scores."""
+    alerts = (scores >= threshold).astype(int)
+    alert_rate = float(alerts.mean()) if len(alerts) else 0.0
+    max_score = float(scores.max()) if len(scores) else 0.0
+    return blend_risk(alert_rate, max_score, threshold), alert_rate, max_score
@@ -0,0 +1,394 @@
+"""
+Sharded fleet scoring. A coordinator splits scada_index.csv into work units (up to --unit-size
+parquet files of one farm) in a shared run directory. Workers on any number of processes or nodes
+claim units through lease files, score them with fleet_risk's per-asset scorer and write partial
+results, which the coordinator merges into fleet_risk.csv.
+
+    python -m src.scoring.sharded run --workers 4                          # local: plan + workers + merge
+    python -m src.scoring.sharded plan --shared-dir /mnt/wfh/shards        # prints the run dir
+    python -m src.scoring.sharded work --run-dir /mnt/wfh/shards/<run>     # on each node
+    python -m src.scoring.sharded merge --run-dir /mnt/wfh/shards/<run>    # waits for all units, merges
+
+Run dir layout:
+    run.json             plan parameters and unit ids (written last; workers wait for it)
+    units/<unit>.json    farm_id + parquet files
+    leases/<unit>.json   worker, attempt, expires_at (created with O_EXCL, renewed between files)
+    parts/<unit>.csv     scored rows; parts/<unit>.json is written after it and marks the unit done
+    errors/<unit>.json   last error and attempt; the unit is failed once attempts reach max_attempts
+
+Leases only prevent duplicate work. A lease past expires_at (worker died or stalled) is taken over
+by the next worker that finds it. Partials are written with write-then-rename and scoring is
+deterministic, so a unit finished twice is harmless. Expiry compares wall clocks, so nodes need
+roughly synchronised clocks.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import socket
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+import pandas as pd
+
+from src.config import settings
+from src.monitoring.telemetry import stage, inc, print_stage_summary, write_textfile
+from src.scoring.fleet_risk import COLUMNS, load_pack, score_asset, write_csv_atomic, write_fleet_risk
+
+INDEX_CSV = settings.index_csv
+THR_PATH = settings.thresholds_path
+OUT_CSV = settings.fleet_risk_csv
+SHARD_DIR = settings.data_dir / "shards"
+
+UNIT_SIZE = 16          # parquet files per work unit
+LEASE_SECONDS = 300     # renewed after every file, so this only needs to cover scoring one file
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 1.0
+
+
+def _write_json(path: Path, obj: Dict[str, Any]) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj, indent=2, default=str))
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):   # absent, or O_EXCL-created but not yet written
+        return None
+
+
+class Run:
+    """One sharded scoring run rooted at a shared directory."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.units_dir = self.root / "units"
+        self.leases_dir = self.root / "leases"
+        self.parts_dir = self.root / "parts"
+        self.errors_dir = self.root / "errors"
+        self._config: Optional[Dict[str, Any]] = None
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        if self._config is None:
+            self._config = _read_json(self.root / "run.json")
+            if self._config is None:
+                raise FileNotFoundError(self.root / "run.json")
+        return self._config
+
+    def unit(self, unit_id: str) -> Dict[str, Any]:
+        return json.loads((self.units_dir / f"{unit_id}.json").read_text())
+
+    def lease_path(self, unit_id: str) -> Path:
+        return self.leases_dir / f"{unit_id}.json"
+
+    def attempts(self, unit_id: str) -> int:
+        err = _read_json(self.errors_dir / f"{unit_id}.json")
+        return int(err["attempt"]) if err else 0
+
+    def status(self) -> Dict[str, List[str]]:
+        done = {p.stem for p in self.parts_dir.glob("*.json")}
+        failed = {
+            p.stem for p in self.errors_dir.glob("*.json")
+            if p.stem not in done and self.attempts(p.stem) >= self.config["max_attempts"]
+        }
+        units = self.config["units"]
+        return {
+            "done": [u for u in units if u in done],
+            "failed": [u for u in units if u in failed],
+            "pending": [u for u in units if u not in done and u not in failed],
+        }
+
+
+def plan(
+    shared_dir: Path = SHARD_DIR,
+    unit_size: int = UNIT_SIZE,
+    lease_seconds: float = LEASE_SECONDS,
+    max_attempts: int = MAX_ATTEMPTS,
+    farms: Optional[List[str]] = None,
+) -> Run:
+    """Partition the index into per-farm units of at most unit_size files under a fresh run dir."""
+    if not THR_PATH.exists():
+        raise FileNotFoundError(f"Missing {THR_PATH}. Run: python src/models/thresholding.py")
+    thr = json.loads(THR_PATH.read_text())
+    idx = pd.read_csv(INDEX_CSV)
+
+    by_farm: Dict[str, List[str]] = {}
+    for fname in idx["parquet_file"]:
+        farm_id = fname.split("__")[0]
+        if farm_id in thr and (not farms or farm_id in farms):
+            by_farm.setdefault(farm_id, []).append(fname)
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + f"_{os.getpid()}"
+    run = Run(Path(shared_dir) / run_id)
+    for d in (run.units_dir, run.leases_dir, run.parts_dir, run.errors_dir):
+        d.mkdir(parents=True, exist_ok=True)
+
+    units = []
+    for farm_id, files in by_farm.items():
+        for k in range(0, len(files), unit_size):
+            unit_id = f"{farm_id}__{k // unit_size:04d}"
+            _write_json(run.units_dir / f"{unit_id}.json",
+                        {"unit_id": unit_id, "farm_id": farm_id, "files": files[k: k + unit_size]})
+            units.append(unit_id)
+
+    _write_json(run.root / "run.json", {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "lease_seconds": lease_seconds,
+        "max_attempts": max_attempts,
+        "unit_size": unit_size,
+        "n_files": sum(len(f) for f in by_farm.values()),
+        "units": units,
+    })
+    return run
+
+
+class Worker:
+    """Claims pending units until none are left, renewing its lease between files."""
+
+    def __init__(self, run: Run, worker_id: Optional[str] = None):
+        self.run = run
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.thr = json.loads(THR_PATH.read_text())
+        self._packs: Dict[str, Any] = {}
+        self.n_units = 0
+
+    def _lease(self, unit_id: str, attempt: int) -> Dict[str, Any]:
+        return {
+            "unit_id": unit_id,
+            "worker": self.worker_id,
+            "attempt": attempt,
+            "expires_at": time.time() + float(self.run.config["lease_seconds"]),
+        }
+
+    def _expires_at(self, lease: Path) -> Optional[float]:
+        info = _read_json(lease)
+        if info is not None:
+            return float(info["expires_at"])
+        try:   # created but never written: fall back to the file's age
+            return lease.stat().st_mtime + float(self.run.config["lease_seconds"])
+        except FileNotFoundError:
+            return None
+
+    def claim(self, unit_id: str) -> Optional[int]:
+        """Take the unit's lease; returns the attempt number, or None if someone else holds it."""
+        lease = self.run.lease_path(unit_id)
+        prev = 0
+        expires_at = self._expires_at(lease)
+        if expires_at is not None:
+            if expires_at > time.time():
+                return None
+            info = _read_json(lease) or {}
+            # rename is atomic: exactly one worker takes over an expired lease
+            grave = lease.with_name(f"{lease.name}.{self.worker_id}.expired")
+            try:
+                os.rename(lease, grave)
+            except FileNotFoundError:
+                return None
+            grave.unlink(missing_ok=True)
+            prev = int(info.get("attempt", 0))
+            inc("shard_leases_expired_total")
+            if prev >= self.run.config["max_attempts"]:
+                _write_json(self.run.errors_dir / f"{unit_id}.json",
+                            {"attempt": prev, "worker": info.get("worker"), "error": "lease expired"})
+                return None
+
+        attempt = max(prev, self.run.attempts(unit_id)) + 1
+        try:
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._lease(unit_id, attempt), f)
+        return attempt
+
+    def renew(self, unit_id: str, attempt: int) -> bool:
+        info = _read_json(self.run.lease_path(unit_id))
+        if info is None or info["worker"] != self.worker_id:
+            return False
+        _write_json(self.run.lease_path(unit_id), self._lease(unit_id, attempt))
+        return True
+
+    def release(self, unit_id: str) -> None:
+        info = _read_json(self.run.lease_path(unit_id))
+        if info is not None and info["worker"] == self.worker_id:
+            self.run.lease_path(unit_id).unlink(missing_ok=True)
+
+    def process(self, unit_id: str, attempt: int) -> bool:
+        unit = self.run.unit(unit_id)
+        farm_id = unit["farm_id"]
+        if farm_id not in self._packs:
+            self._packs[farm_id] = load_pack(farm_id)
+        model, feats = self._packs[farm_id]
+        threshold = float(self.thr[farm_id]["threshold"])
+
+        t0 = time.perf_counter()
+        rows = []
+        for fname in unit["files"]:
+            if not self.renew(unit_id, attempt):
+                inc("shard_leases_lost_total")
+                return False
+            row = score_asset(fname, farm_id, model, feats, threshold)
+            if row is not None:
+                rows.append(row)
+
+        write_csv_atomic(pd.DataFrame(rows, columns=COLUMNS), self.run.parts_dir / f"{unit_id}.csv")
+        _write_json(self.run.parts_dir / f"{unit_id}.json", {
+            "unit_id": unit_id,
+            "worker": self.worker_id,
+            "attempt": attempt,
+            "n_assets": len(rows),
+            "seconds": time.perf_counter() - t0,
+        })
+        inc("shard_units_total", status="done")
+        return True
+
+    def work(self) -> int:
+        rng = random.Random(self.worker_id)   # spread workers over the unit list
+        while True:
+            pending = self.run.status()["pending"]
+            if not pending:
+                return self.n_units
+            rng.shuffle(pending)
+            for unit_id in pending:
+                attempt = self.claim(unit_id)
+                if attempt is None:
+                    continue
+                try:
+                    if self.process(unit_id, attempt):
+                        self.n_units += 1
+                except Exception as e:
+                    inc("shard_units_total", status="error")
+                    _write_json(self.run.errors_dir / f"{unit_id}.json",
+                                {"attempt": attempt, "worker": self.worker_id, "error": repr(e)})
+                    print(f"[{self.worker_id}] {unit_id} attempt {attempt} failed: {e!r}", flush=True)
+                finally:
+                    self.release(unit_id)
+                break
+            else:
+                time.sleep(POLL_SECONDS)   # everything pending is leased; wait for it to finish or expire
+
+
+def work(run_dir: Path, worker_id: Optional[str] = None, wait_seconds: float = 60.0) -> int:
+    run = Run(run_dir)
+    deadline = time.time() + wait_seconds
+    while _read_json(run.root / "run.json") is None:   # plan may still be writing units
+        if time.time() > deadline:
+            raise FileNotFoundError(run.root / "run.json")
+        time.sleep(POLL_SECONDS)
+
+    worker = Worker(run, worker_id)
+    n = worker.work()
+    print(f"[{worker.worker_id}] done: {n} unit(s)", flush=True)
+    write_textfile(settings.metrics_dir / f"fleet_risk_shard_{worker.worker_id}.prom")
+    return n
+
+
+def merge(
+    run: Run,
+    out_csv: Path = OUT_CSV,
+    timeout: Optional[float] = None,
+    local_workers: int = 0,
+) -> pd.DataFrame:
+    """
+    Wait for every unit to be done or failed, then merge the partials into out_csv.
+    With local_workers, keeps that many worker processes alive: if they all exit with units
+    still pending (e.g. a worker was killed), fresh workers are started to take over the
+    expired leases. Raises without writing if any unit failed.
+    """
+    ctx = mp.get_context("spawn")
+    procs: List[mp.Process] = []
+    rounds = 0
+    t0 = time.time()
+
+    while True:
+        st = run.status()
+        if not st["pending"]:
+            break
+        if timeout is not None and time.time() - t0 > timeout:
+            raise TimeoutError(f"{len(st['pending'])} unit(s) still pending after {timeout}s")
+        if local_workers and not any(p.is_alive() for p in procs):
+            if rounds > run.config["max_attempts"]:
+                raise RuntimeError(f"Local workers keep exiting with {len(st['pending'])} unit(s) pending")
+            procs = [
+                ctx.Process(target=work, args=(run.root, f"local{rounds}-{i}"), daemon=True)
+                for i in range(local_workers)
+            ]
+            for p in procs:
+                p.start()
+            rounds += 1
+        time.sleep(POLL_SECONDS)
+
+    for p in procs:
+        p.join()
+    if st["failed"]:
+        errors = {u: (_read_json(run.errors_dir / f"{u}.json") or {}).get("error") for u in st["failed"]}
+        raise RuntimeError(f"{len(errors)} unit(s) failed after {run.config['max_attempts']} attempts: {errors}")
+
+    with stage("merge_partials"):
+        parts = [pd.read_csv(run.parts_dir / f"{u}.csv") for u in st["done"]]
+        merged = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=COLUMNS)
+        out = write_fleet_risk(merged, out_csv)
+
+    print(f"Saved: {out_csv} ({len(out)} assets from {len(parts)} unit(s) in {time.time() - t0:.1f}s)")
+    if not parts:
+        return out
+    meta = pd.DataFrame([_read_json(run.parts_dir / f"{u}.json") for u in st["done"]])
+    print(meta.groupby("worker").agg(units=("unit_id", "size"), assets=("n_assets", "sum"), seconds=("seconds", "sum")))
+    retried = meta[meta["attempt"] > 1]
+    if len(retried):
+        print(f"Retried units: {', '.join(retried['unit_id'])}")
+    return out
+
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Sharded fleet scoring over a shared directory.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    def plan_args(p):
+        p.add_argument("--shared-dir", type=Path, default=SHARD_DIR)
+        p.add_argument("--unit-size", type=int, default=UNIT_SIZE, help="parquet files per work unit")
+        p.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS)
+        p.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        p.add_argument("--farms", nargs="*", default=None)
+
+    p_run = sub.add_parser("run", help="plan, score with local worker processes, merge")
+    plan_args(p_run)
+    p_run.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_run.add_argument("--timeout", type=float, default=None)
+
+    plan_args(sub.add_parser("plan", help="write work units and print the run dir"))
+
+    p_work = sub.add_parser("work", help="claim and score units until none are left")
+    p_work.add_argument("--run-dir", type=Path, required=True)
+    p_work.add_argument("--worker-id", default=None)
+
+    p_merge = sub.add_parser("merge", help="wait for all units, then write fleet_risk.csv")
+    p_merge.add_argument("--run-dir", type=Path, required=True)
+    p_merge.add_argument("--timeout", type=float, default=None)
+    p_merge.add_argument("--workers", type=int, default=0, help="also run this many local workers")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "work":
+        work(args.run_dir, args.worker_id)
+        return
+    if args.cmd == "merge":
+        merge(Run(args.run_dir), timeout=args.timeout, local_workers=args.workers)
+        print_stage_summary()
+        return
+
+    run = plan(args.shared_dir, args.unit_size, args.lease_seconds, args.max_attempts, args.farms)
+    print(f"Planned {len(run.config['units'])} unit(s) for {run.config['n_files']} file(s): {run.root}", flush=True)
+    if args.cmd == "run":
+        merge(run, timeout=args.timeout, local_workers=args.workers)
+        print_stage_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.config import settings
+from src.monitoring.telemetry import stage, rows_scored
+from src.scoring.risk import align_features, feature_matrix, blend_risk
+
+CHUNK_ROWS = settings.chunk_rows   # rows read + scored at a time; bounds memory regardless of window length
+TAIL_ALERTS = 50
+RECENT_HOURS = 24     # "recent" period for top contributors
+
+
+@dataclass
+class WindowPlan:
+    """Which rows of a parquet file fall in the scoring window, decided from the timestamp column alone."""
+    ts: np.ndarray          # datetime64[ns] per file row (NaT where unparseable)
+    mask: np.ndarray        # bool per file row: inside window
+    t_start: pd.Timestamp
+    t_end: pd.Timestamp
+
+    @property
+    def n(self) -> int:
+        return int(self.mask.sum())
+
+    def positions(self) -> np.ndarray:
+        """Window row positions in time order."""
+        pos = np.flatnonzero(self.mask)
+        return pos[np.argsort(self.ts[pos], kind="stable")]
+
+
+def plan_window(
+    path: Path,
+    lookback_hours: Optional[int] = None,
+    t_start: Optional[pd.Timestamp] = None,
+    t_end: Optional[pd.Timestamp] = None,
+) -> WindowPlan:
+    with stage("read_parquet"):
+        raw = pd.read_parquet(path, columns=["timestamp"])["timestamp"]
+    with stage("to_datetime"):
+        ts = pd.to_datetime(raw, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    valid = ~np.isnat(ts)
+    if not valid.any():
+        raise ValueError("No timestamped rows in parquet.")
+
+    tmax = pd.Timestamp(ts[valid].max())
+    t_end = pd.Timestamp(t_end) if t_end is not None else tmax
+    if t_start is None:
+        t_start = t_end - pd.Timedelta(hours=lookback_hours or 0)
+    t_start = pd.Timestamp(t_start)
+
+    mask = valid & (ts >= t_start.to_datetime64()) & (ts <= t_end.to_datetime64())
+    return WindowPlan(ts=ts, mask=mask, t_start=t_start, t_end=t_end)
+
+
+def iter_scored_chunks(
+    path: Path,
+    model,
+    feats: List[str],
+    plan: WindowPlan,
+    extra_cols: Tuple[str, ...] = (),
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[Tuple[np.ndarray, pd.DataFrame, np.ndarray]]:
+    """
+    Stream the window rows of a parquet file in chunks of at most chunk_rows.
+    Yields (file row positions, chunk frame with feats + extra_cols, anomaly scores).
+    Row groups without any window rows are skipped without being read.
+    """
+    pf = pq.ParquetFile(path)
+    available = set(pf.schema_arrow.names)
+    read_cols = [c for c in dict.fromkeys(list(feats) + list(extra_cols)) if c in available]
+
+    offset = 0
+    for rg in range(pf.num_row_groups):
+        n_rg = pf.metadata.row_group(rg).num_rows
+        if not plan.mask[offset: offset + n_rg].any():
+            offset += n_rg
+            continue
+
+        batches = pf.iter_batches(batch_size=chunk_rows, row_groups=[rg], columns=read_cols)
+        while True:
+            with stage("read_parquet"):
+                batch = next(batches, None)
+            if batch is None:
+                break
+            m = plan.mask[offset: offset + batch.num_rows]
+            if m.any():
+                df = batch.filter(pa.array(m)).to_pandas()
+                with stage("align_features"):
+                    X = feature_matrix(df.copy(), feats)
+                t0 = time.perf_counter()
+                with stage("score_samples"):
+                    scores = -model.score_samples(X)
+                rows_scored(len(X), time.perf_counter() - t0, source="stream")
+                yield np.flatnonzero(m) + offset, df, scores
+            offset += batch.num_rows
+
+
+class _Moments:
+    """Per-column NaN-aware count/mean/M2, merged chunk by chunk (Chan et al.)."""
+
+    def __init__(self, n_cols: int):
+        self.count = np.zeros(n_cols)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+
+    def update(self, X: np.ndarray) -> None:
+        if not len(X):
+            return
+        cnt = (~np.isnan(X)).sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(cnt > 0, np.nansum(X, axis=0) / np.maximum(cnt, 1), 0.0)
+            m2 = np.nansum((X - mean) ** 2, axis=0)
+        tot = self.count + cnt
+        delta = mean - self.mean
+        safe = np.maximum(tot, 1)
+        self.mean = self.mean + delta * cnt / safe
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * cnt / safe
+        self.count = tot
+
+    def mean_or_nan(self) -> np.ndarray:
+        return np.where(self.count > 0, self.mean, np.nan)
+
+    def std_or_nan(self) -> np.ndarray:
+        # sample std (ddof=1), like pandas
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+
+def score_window_exact(
+    path: Path,
+    model,
+    feats: List[str],
+    threshold: float,
+    lookback_hours: int,
+    chunk_rows: int = CHUNK_ROWS,
+    t_end: Optional[pd.Timestamp] = None,
+) -> Dict[str, Any]:
+    """
+    Score every row in the lookback window ending at t_end (default: the last timestamp), chunk
+    by chunk, folding into running aggregates: alert count / max score, the last TAIL_ALERTS
+    alerts, and baseline/recent feature moments for top contributors. Memory is bounded by
+    chunk_rows, not by the window length.
+    """
+    plan = plan_window(path, lookback_hours=lookback_hours, t_end=t_end)
+    n = plan.n
+    if n == 0:
+        raise ValueError("No rows in lookback window.")
+
+    # same baseline/recent definitions as the in-memory top_contributors, decided up front from timestamps
+    order = plan.positions()
+    base_mask = np.zeros(len(plan.mask), dtype=bool)
+    base_mask[order[: max(200, int(0.3 * n))]] = True
+    recent_mask = plan.mask & (plan.ts >= (plan.t_end - pd.Timedelta(hours=RECENT_HOURS)).to_datetime64())
+    if recent_mask.sum() < 50:
+        recent_mask = np.zeros(len(plan.mask), dtype=bool)
+        recent_mask[order[-200:]] = True
+    first_pos = int(order[0])
+
+    base = _Moments(len(feats))
+    recent_sum = np.zeros(len(feats))
+    recent_cnt = np.zeros(len(feats))
+    n_alerts = 0
+    max_score = -np.inf
+    tail_ts = np.empty(0, dtype="datetime64[ns]")
+    tail_scores = np.empty(0, dtype=np.float64)
+    asset_id = None
+
+    for pos, df, scores in iter_scored_chunks(path, model, feats, plan, ("asset_id",), chunk_rows):
+        alerts = scores >= threshold
+        n_alerts += int(alerts.sum())
+        max_score = max(max_score, float(scores.max()))
+
+        if alerts.any():
+            tail_ts = np.concatenate([tail_ts, plan.ts[pos[alerts]]])
+            tail_scores = np.concatenate([tail_scores, scores[alerts]])
+            keep = np.argsort(tail_ts, kind="stable")[-TAIL_ALERTS:]
+            tail_ts, tail_scores = tail_ts[keep], tail_scores[keep]
+
+        if asset_id is None and "asset_id" in df.columns:
+            hit = np.flatnonzero(pos == first_pos)
+            if len(hit):
+                asset_id = df["asset_id"].iloc[int(hit[0])]
+
+        X = align_features(df.copy(), feats).to_numpy(dtype=np.float64)
+        base.update(X[base_mask[pos]])
+        Xr = X[recent_mask[pos]]
+        recent_sum += np.nansum(Xr, axis=0)
+        recent_cnt += (~np.isnan(Xr)).sum(axis=0)
+
+    alert_rate = n_alerts / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rec_mean = pd.Series(np.where(recent_cnt > 0, recent_sum / np.maximum(recent_cnt, 1), np.nan), index=feats)
+    base_mean = pd.Series(base.mean_or_nan(), index=feats)
+    base_std = pd.Series(base.std_or_nan(), index=feats).replace(0, np.nan)
+
+    with stage("top_contributors"):
+        z_shift = ((rec_mean - base_mean).abs() / base_std).replace([np.inf, -np.inf], np.nan).dropna()
+        top = z_shift.sort_values(ascending=False).head(10)
+
+    return {
+        "asset_id": str(asset_id),
+        "t_end": str(plan.t_end),
+        "risk_score": blend_risk(alert_rate, max_score, threshold),
+        "alert_rate": alert_rate,
+        "max_anomaly_score": max_score,
+        "n_points_scored": n,
+        "alerts_tail": [
+            {"timestamp": str(pd.Timestamp(t)), "anomaly_score": float(s)}
+            for t, s in zip(tail_ts, tail_scores)
+        ],
+        "top_contributors": [
+            {
+                "feature": f,
+                "z_shift": float(top.loc[f]),
+                "recent_mean": float(rec_mean.loc[f]),
+                "baseline_mean": float(base_mean.loc[f]),
+            }
+            for f in top.index
+        ],
+    }
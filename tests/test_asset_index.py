@@ -0,0 +1,90 @@
+import json
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from src.api.asset_index import AssetIndex
+from src.api.service import parse_ts
+
+CATALOG = [
+    # an asset with an old and a new dataset, and a farm whose only dataset is empty
+    ("A__0.parquet", "A", 0, 7, 100, "2022-01-01", "2022-06-30", 0.1),
+    ("A__1.parquet", "A", 1, 7, 300, "2023-01-01", "2023-06-30", 0.3),
+    ("A__2.parquet", "A", 2, 8, 100, "2023-01-01", "2023-03-31", 0.0),
+    ("B__3.parquet", "B", 3, 1, 0, None, None, None),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "dataset_catalog.csv"
+    pd.DataFrame(CATALOG, columns=[
+        "parquet_file", "farm_id", "dataset_id", "asset_id", "n_rows", "ts_min", "ts_max", "abnormal_rate",
+    ]).to_csv(path, index=False)
+    return AssetIndex(path)
+
+
+def ts(s):
+    return pd.Timestamp(s)
+
+
+def test_lookup_lists_datasets_newest_first(index):
+    assert [d["parquet_file"] for d in index.lookup("A", 7)] == ["A__1.parquet", "A__0.parquet"]
+    assert index.lookup("A", "7") == index.lookup("A", 7)
+    assert index.lookup("B", 7) == []
+
+
+def test_resolve_without_window_is_the_newest_dataset(index):
+    assert index.resolve("A", 7)["parquet_file"] == "A__1.parquet"
+    assert index.resolve("A", 99) is None
+
+
+@pytest.mark.parametrize("t_start, t_end, expected", [
+    ("2022-03-01", "2022-03-02", "A__0.parquet"),    # inside the old dataset
+    ("2023-06-29", "2023-07-02", "A__1.parquet"),    # t_end past ts_max, window still overlaps
+    ("2022-06-29", "2023-01-02", "A__1.parquet"),    # overlaps both: newest wins
+    ("2022-12-30", None, "A__1.parquet"),
+    (None, "2022-02-01", "A__0.parquet"),
+    ("2022-08-01", "2022-09-01", None),              # in the gap between datasets
+])
+def test_resolve_picks_the_newest_overlapping_dataset(index, t_start, t_end, expected):
+    match = index.resolve("A", 7, t_start and ts(t_start), t_end and ts(t_end))
+    assert (match and match["parquet_file"]) == expected
+
+
+def test_resolve_agrees_with_coverage(index):
+    """Naming the asset resolves to a dataset whose own coverage check would accept the window."""
+    t_start, t_end = ts("2023-06-29 12:00"), ts("2023-07-01")
+    pf = index.resolve("A", 7, t_start, t_end)["parquet_file"]
+    ts_min, ts_max = index.coverage(pf)
+    assert t_end >= ts_min and t_start <= ts_max
+
+
+def test_assets_filters_by_farm_and_window(index):
+    assert index.assets(farms=["B"])["total"] == 1
+    rows = index.assets(t_start=ts("2023-04-01"), t_end=ts("2023-05-01"))["rows"]
+    assert [r["parquet_file"] for r in rows] == ["A__1.parquet"]
+    page = index.assets(offset=1, limit=2)
+    assert page["total"] == 4 and len(page["rows"]) == 2
+
+
+def test_farm_summaries_skip_empty_datasets(index):
+    farms = {f["farm_id"]: f for f in index.farms()}
+    json.dumps(farms, allow_nan=False)
+    assert farms["A"]["n_assets"] == 2 and farms["A"]["n_rows"] == 500
+    assert farms["A"]["abnormal_rate"] == pytest.approx((0.1 * 100 + 0.3 * 300 + 0.0 * 100) / 500)
+    assert farms["B"] == {
+        "farm_id": "B", "n_assets": 1, "n_datasets": 1, "n_rows": 0,
+        "ts_min": None, "ts_max": None, "abnormal_rate": None,
+    }
+
+
+def test_parse_ts_converts_tz_aware_to_naive_utc():
+    assert parse_ts("2023-11-01T00:00:00Z", "t") == ts("2023-11-01")
+    assert parse_ts("2023-11-01T02:00:00+02:00", "t") == ts("2023-11-01")
+    assert parse_ts("2023-11-01 00:00", "t") == ts("2023-11-01")
+    assert parse_ts(None, "t") is None
+    with pytest.raises(HTTPException) as e:
+        parse_ts("bogus", "t_end")
+    assert e.value.status_code == 400
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from src.api.downsample import lttb_indices, minmax_indices, downsample_indices, downsample_columns
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    x = np.arange(10_000, dtype=np.int64)
+    y = np.sin(x / 500) + rng.normal(0, 0.05, len(x))
+    return x, y
+
+
+def test_lttb_keeps_endpoints_and_returns_n_out_sorted_indices(series):
+    x, y = series
+    idx = lttb_indices(x, y, 500)
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_returns_everything_when_nothing_to_drop(series):
+    x, y = series
+    assert np.array_equal(lttb_indices(x[:100], y[:100], 500), np.arange(100))
+    assert np.array_equal(lttb_indices(x, y, 2), np.arange(len(x)))
+
+
+def test_lttb_keeps_an_isolated_spike(series):
+    x, y = series
+    y = y.copy()
+    y[4321] = 50.0
+    assert 4321 in lttb_indices(x, y, 200)
+
+
+def test_lttb_is_not_derailed_by_nan_gaps(series):
+    x, y = series
+    y = y.copy()
+    y[::97] = np.nan
+    y[6000] = 50.0
+    idx = lttb_indices(x, y, 200)
+    assert len(idx) == 200 and 6000 in idx
+
+
+def test_minmax_keeps_each_bucket_extremes(series):
+    x, y = series
+    idx = minmax_indices(y, 100)
+    assert len(idx) <= 100 and np.all(np.diff(idx) > 0)
+    for lo, hi in zip(np.linspace(0, len(y), 51).astype(int)[:-1], np.linspace(0, len(y), 51).astype(int)[1:]):
+        assert lo + np.argmax(y[lo:hi]) in idx
+        assert lo + np.argmin(y[lo:hi]) in idx
+
+
+def test_minmax_all_nan_bucket_does_not_raise():
+    y = np.r_[np.full(50, np.nan), np.arange(50.0)]
+    idx = minmax_indices(y, 10)
+    assert len(idx) and idx.max() < len(y)
+
+
+def test_unknown_method_raises(series):
+    x, y = series
+    with pytest.raises(ValueError):
+        downsample_indices(x, y, 100, "median")
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_columns_keep_a_spike_in_any_column(series, method):
+    x, score = series
+    sensor = np.zeros(len(x))
+    sensor[7777] = 100.0   # not a score extreme: picking from the score alone would drop it
+    idx = downsample_columns(x, [score, sensor], 400, method)
+    assert 7777 in idx
+    assert len(idx) <= 400 and np.all(np.diff(idx) > 0)
@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.api.fleet_store import FleetStore
+
+
+def fleet_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "farm_id": [f"Wind_Farm_{'AB'[i % 2]}" for i in range(n)],
+        "parquet_file": [f"f{i}.parquet" for i in range(n)],
+        "asset_id": np.arange(n),
+        "risk_score": rng.uniform(0, 100, n).round(3),
+        "alert_rate": rng.uniform(0, 1, n),
+    })
+
+
+def write_csv(df, path):
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "fleet_risk.csv"
+    write_csv(fleet_frame(200), path)
+    return FleetStore(path)
+
+
+def test_query_filters_by_risk_range_and_farm(store):
+    df = fleet_frame(200)
+    q = store.query(farms=["Wind_Farm_A"], risk_min=20, risk_max=60, limit=1000)
+
+    expected = df[(df["farm_id"] == "Wind_Farm_A") & df["risk_score"].between(20, 60)]
+    assert q["total"] == len(expected)
+    assert sorted(r["parquet_file"] for r in q["rows"]) == sorted(expected["parquet_file"])
+    assert sum(q["bucket_counts"].values()) == q["total"]
+    assert q["summary"]["max_risk"] == pytest.approx(expected["risk_score"].max())
+
+
+def test_query_sorts_and_pages(store):
+    desc = store.query(limit=1000)["rows"]
+    assert [r["risk_score"] for r in desc] == sorted((r["risk_score"] for r in desc), reverse=True)
+
+    pages = [store.query(offset=o, limit=30)["rows"] for o in range(0, 200, 30)]
+    assert [r["parquet_file"] for p in pages for r in p] == [r["parquet_file"] for r in desc]
+
+    by_alert = store.query(sort_by="alert_rate", ascending=True, limit=1000)["rows"]
+    assert [r["alert_rate"] for r in by_alert] == sorted(r["alert_rate"] for r in by_alert)
+    with pytest.raises(KeyError):
+        store.query(sort_by="nope")
+
+
+def test_lookup_file_and_reload_on_change(store):
+    assert store.lookup_file("f3.parquet")["asset_id"] == "3"
+    assert store.lookup_file("missing.parquet") is None
+
+    write_csv(fleet_frame(10, seed=1), store.path)
+    assert store.query()["total"] == 10
+    assert store.lookup_file("f50.parquet") is None
+    assert store.n_reloads == 2
+
+
+def test_nan_risk_score_keeps_query_json_safe(tmp_path):
+    path = tmp_path / "fleet_risk.csv"
+    df = fleet_frame(4)
+    df.loc[1, "risk_score"] = np.nan
+    write_csv(df, path)
+
+    q = FleetStore(path).query()
+    json.dumps(q, allow_nan=False)
+    assert q["total"] == 3
+    assert q["risk_range"] == [df["risk_score"].min(), df["risk_score"].max()]
+
+
+def test_missing_file(tmp_path):
+    store = FleetStore(tmp_path / "absent.csv")
+    assert store.farms() == [] and store.lookup_file("f0.parquet") is None
+    with pytest.raises(FileNotFoundError):
+        store.query()
+
+
+def test_readers_never_see_a_half_reloaded_index(store):
+    """Four readers page through the index while the CSV is rewritten between 50 and 5000 rows."""
+    errors, stop = [], threading.Event()
+
+    def reader(seed):
+        rng = np.random.default_rng(seed)
+        while not stop.is_set():
+            try:
+                offset = int(rng.integers(0, 2500))
+                # a sort column other than risk_score reads a second array indexed by the first
+                q = store.query(farms=["Wind_Farm_A"], sort_by="alert_rate", offset=offset, limit=100)
+                assert sum(q["bucket_counts"].values()) == q["total"]
+                assert len(q["rows"]) == max(0, min(100, q["total"] - offset))
+                assert all(r["farm_id"] == "Wind_Farm_A" for r in q["rows"])
+            except Exception as e:   # collected and reported by the main thread
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    deadline = time.time() + 3
+    n = 0
+    while time.time() < deadline and not errors:
+        write_csv(fleet_frame(50 if n % 2 else 5000, seed=n), store.path)
+        n += 1
+    stop.set()
+    for t in threads:
+        t.join()
+
+    assert not errors, errors[0]
+    assert store.n_reloads > 2
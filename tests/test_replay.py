@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.api.fleet_store import RiskHistoryStore
+from src.scoring.replay import sliding_max, daily_risk
+from src.scoring.risk import blend_risk
+
+
+@pytest.mark.parametrize("n", [0, 1, 5, 100, 101])
+@pytest.mark.parametrize("window", [1, 2, 3, 7, 24, 200])
+def test_sliding_max_matches_brute_force(n, window):
+    v = np.random.default_rng(n * 1000 + window).normal(size=n)
+    expected = np.array([v[max(0, i - window + 1): i + 1].max() for i in range(n)])
+    assert np.array_equal(sliding_max(v, window), expected)
+
+
+def irregular_rows(seed, n=3000, days=40):
+    """Scores at random times, with a multi-day gap so some windows are empty."""
+    rng = np.random.default_rng(seed)
+    t0 = np.datetime64("2023-01-01T05:17:00", "ns")
+    offsets = np.sort(rng.uniform(0, days * 86400, n)).astype("timedelta64[s]")
+    ts = t0 + offsets
+    keep = (ts < t0 + np.timedelta64(15, "D")) | (ts > t0 + np.timedelta64(22, "D"))
+    return ts[keep], rng.gamma(2.0, 0.2, keep.sum())
+
+
+@pytest.mark.parametrize("lookback_hours", [1, 24, 72, 720])
+def test_daily_risk_matches_brute_force(lookback_hours):
+    ts, scores = irregular_rows(lookback_hours)
+    threshold = 0.6
+
+    risk = daily_risk(ts, scores, threshold, lookback_hours)
+
+    assert risk.index[0] == "2023-01-01"
+    if lookback_hours < 7 * 24:   # shorter than the gap
+        assert risk.isna().any()
+    for day, value in risk.items():
+        end = (pd.Timestamp(day) + pd.Timedelta(days=1)).to_datetime64()
+        m = (ts >= end - np.timedelta64(lookback_hours, "h")) & (ts < end)
+        if not m.any():
+            assert np.isnan(value), day
+        else:
+            expected = blend_risk(float((scores[m] >= threshold).mean()), float(scores[m].max()), threshold)
+            assert value == pytest.approx(expected), day
+
+
+def test_history_trend_covers_every_matching_asset(tmp_path):
+    path = tmp_path / "fleet_risk_history.csv"
+    days = ["2023-01-01", "2023-01-02", "2023-01-03"]
+    pd.DataFrame([
+        ["A", "a0.parquet", 0, 90.0, 85.0, None],
+        ["A", "a1.parquet", 1, 10.0, None, None],
+        ["A", "a2.parquet", 2, 50.0, 95.0, 20.0],
+        ["B", "b0.parquet", 0, 99.0, 99.0, 99.0],
+    ], columns=["farm_id", "parquet_file", "asset_id", *days]).to_csv(path, index=False)
+
+    q = RiskHistoryStore(path).query(farms=["A"], sort_by="peak", limit=1)
+
+    assert q["total"] == 3
+    assert [a["parquet_file"] for a in q["assets"]] == ["a2.parquet"]
+    assert q["trend"] == {"mean_risk": [50.0, 90.0, 20.0], "n_high": [1, 2, 0], "n_assets": [3, 2, 1]}
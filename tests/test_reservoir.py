@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.models.train_isoforest import Reservoir
+
+SIZES = [5, 60, 15, 20]    # unequal per-file streams, 100 rows in total
+K = 10
+
+
+def file_reservoirs(rng):
+    """One reservoir per file, fed in two chunks, as scan_file does with random keys per row."""
+    out, start = [], 0
+    for n in SIZES:
+        rows = np.arange(start, start + n, dtype=np.float32)[:, None]
+        r = Reservoir(K, 1)
+        for part in np.array_split(np.arange(n), 2):
+            r.offer(rows[part], np.zeros(len(part), dtype=np.int8), rng.random(len(part)))
+        out.append(r)
+        start += n
+    return out
+
+
+def merged(reservoirs, order):
+    total = Reservoir(K, 1)
+    for i in order:
+        total.merge(reservoirs[i])
+    return total
+
+
+def test_merge_keeps_k_rows_and_counts_everything_seen():
+    total = merged(file_reservoirs(np.random.default_rng(0)), range(len(SIZES)))
+    X, y = total.sorted()
+    assert X.shape == (K, 1) and len(y) == K
+    assert len(np.unique(X)) == K
+    assert total.n_seen == sum(SIZES)
+
+
+def test_merge_order_does_not_change_the_sample():
+    reservoirs = file_reservoirs(np.random.default_rng(1))
+    a, _ = merged(reservoirs, [0, 1, 2, 3]).sorted()
+    b, _ = merged(reservoirs, [3, 1, 0, 2]).sorted()
+    assert np.array_equal(a, b)
+
+
+def test_merged_sample_is_uniform_over_all_rows():
+    rng = np.random.default_rng(2)
+    trials = 3000
+    counts = np.zeros(sum(SIZES))
+    for _ in range(trials):
+        X, _ = merged(file_reservoirs(rng), rng.permutation(len(SIZES))).sorted()
+        counts[X[:, 0].astype(int)] += 1
+
+    # each row is kept with probability K / N regardless of which file it came from
+    p = K / sum(SIZES)
+    sd = np.sqrt(trials * p * (1 - p))
+    assert np.abs(counts - trials * p).max() < 5 * sd
+    per_file = [c.sum() / (trials * K) for c in np.split(counts, np.cumsum(SIZES)[:-1])]
+    assert np.allclose(per_file, np.array(SIZES) / sum(SIZES), atol=0.02)
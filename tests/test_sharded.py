@@ -0,0 +1,135 @@
+import json
+import multiprocessing as mp
+import time
+
+import pandas as pd
+import pytest
+
+from src.config import settings
+from src.scoring import sharded
+from src.scoring.fleet_risk import COLUMNS
+
+FARMS = {"Wind_Farm_A": 5, "Wind_Farm_B": 3}
+
+
+def stub_score_asset(fname, farm_id, model, feats, threshold):
+    """Deterministic stand-in for fleet_risk.score_asset: no model, no Parquet."""
+    if "bad" in fname:
+        raise ValueError(f"cannot score {fname}")
+    return {
+        "farm_id": farm_id, "parquet_file": fname, "asset_id": fname.split("__")[1].split(".")[0],
+        "t_end": "2023-01-01 00:00:00", "lookback_hours": 24, "risk_score": float(len(fname)),
+        "alert_rate": 0.0, "max_anomaly_score": 0.0, "threshold": threshold, "n_points_scored": 1,
+    }
+
+
+def stub_work(run_dir, worker_id):
+    # spawned processes start from a fresh import, so the stub is patched in here
+    sharded.load_pack = lambda farm_id: (None, [])
+    sharded.score_asset = stub_score_asset
+    sharded.work(run_dir, worker_id)
+
+
+@pytest.fixture
+def fleet(tmp_path, monkeypatch):
+    """A scada index and thresholds under tmp_path, which becomes the working directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sharded, "POLL_SECONDS", 0.05)
+    monkeypatch.setattr(sharded, "load_pack", lambda farm_id: (None, []))
+    monkeypatch.setattr(sharded, "score_asset", stub_score_asset)
+    files = [f"{farm}__{i}.parquet" for farm, n in FARMS.items() for i in range(n)]
+    settings.index_csv.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame({"parquet_file": files}).to_csv(settings.index_csv, index=False)
+    settings.thresholds_path.parent.mkdir(parents=True, exist_ok=True)
+    settings.thresholds_path.write_text(json.dumps({farm: {"threshold": 0.5} for farm in FARMS}))
+    return files
+
+
+def write_lease(run, unit_id, worker, attempt, expires_in):
+    run.lease_path(unit_id).write_text(json.dumps(
+        {"unit_id": unit_id, "worker": worker, "attempt": attempt, "expires_at": time.time() + expires_in}
+    ))
+
+
+def test_plan_splits_each_farm_into_units(fleet, tmp_path):
+    run = sharded.plan(tmp_path / "shards", unit_size=2)
+
+    units = [run.unit(u) for u in run.config["units"]]
+    assert [len(u["files"]) for u in units] == [2, 2, 1, 2, 1]
+    assert all(f.startswith(u["farm_id"] + "__") for u in units for f in u["files"])
+    assert sorted(f for u in units for f in u["files"]) == sorted(fleet)
+    assert run.status()["pending"] == run.config["units"]
+
+
+def test_two_spawned_workers_then_merge(fleet, tmp_path):
+    run = sharded.plan(tmp_path / "shards", unit_size=2)
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=stub_work, args=(run.root, f"w{i}")) for i in range(2)]
+    for p in procs:
+        p.start()
+    out_csv = tmp_path / "fleet_risk.csv"
+    out = sharded.merge(run, out_csv=out_csv, timeout=60)
+    for p in procs:
+        p.join(timeout=30)
+        assert p.exitcode == 0
+
+    assert sorted(out["parquet_file"]) == sorted(fleet)
+    assert list(pd.read_csv(out_csv).columns) == COLUMNS
+    assert out["risk_score"].is_monotonic_decreasing
+    done = [json.loads((run.parts_dir / f"{u}.json").read_text()) for u in run.config["units"]]
+    assert {d["worker"] for d in done} <= {"w0", "w1"}
+    assert not list(run.leases_dir.iterdir())
+
+
+def test_live_lease_is_respected_and_renewed_by_its_owner(fleet, tmp_path):
+    run = sharded.plan(tmp_path / "shards", unit_size=2, lease_seconds=60)
+    unit_id = run.config["units"][0]
+    owner, other = sharded.Worker(run, "owner"), sharded.Worker(run, "other")
+
+    assert owner.claim(unit_id) == 1
+    assert other.claim(unit_id) is None
+    before = json.loads(run.lease_path(unit_id).read_text())["expires_at"]
+    time.sleep(0.01)
+    assert owner.renew(unit_id, 1)
+    assert json.loads(run.lease_path(unit_id).read_text())["expires_at"] > before
+    assert not other.renew(unit_id, 1)
+
+    owner.release(unit_id)
+    assert not run.lease_path(unit_id).exists()
+
+
+def test_expired_lease_is_taken_over(fleet, tmp_path):
+    run = sharded.plan(tmp_path / "shards", unit_size=2, lease_seconds=60)
+    unit_id = run.config["units"][0]
+    write_lease(run, unit_id, "dead", attempt=1, expires_in=-1)
+
+    worker = sharded.Worker(run, "live")
+    assert worker.claim(unit_id) == 2
+    assert json.loads(run.lease_path(unit_id).read_text())["worker"] == "live"
+    # the stalled worker can no longer renew, so it stops instead of writing a duplicate part
+    assert not sharded.Worker(run, "dead").renew(unit_id, 1)
+
+
+def test_expired_lease_at_max_attempts_fails_the_unit(fleet, tmp_path):
+    run = sharded.plan(tmp_path / "shards", unit_size=2, max_attempts=2)
+    unit_id = run.config["units"][0]
+    write_lease(run, unit_id, "dead", attempt=2, expires_in=-1)
+
+    assert sharded.Worker(run, "live").claim(unit_id) is None
+    assert run.status()["failed"] == [unit_id]
+
+
+def test_unit_that_keeps_failing_fails_the_merge(fleet, tmp_path):
+    pd.DataFrame({"parquet_file": fleet + ["Wind_Farm_B__bad.parquet"]}).to_csv(settings.index_csv, index=False)
+    run = sharded.plan(tmp_path / "shards", unit_size=2, max_attempts=2)
+
+    sharded.Worker(run, "w").work()
+
+    st = run.status()
+    bad = [u for u in run.config["units"] if "Wind_Farm_B__bad.parquet" in run.unit(u)["files"]]
+    assert st["failed"] == bad and not st["pending"]
+    assert json.loads((run.errors_dir / f"{bad[0]}.json").read_text())["attempt"] == 2
+    out_csv = tmp_path / "fleet_risk.csv"
+    with pytest.raises(RuntimeError, match="failed after 2 attempts"):
+        sharded.merge(run, out_csv=out_csv, timeout=10)
+    assert not out_csv.exists()